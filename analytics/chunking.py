@@ -0,0 +1,207 @@
+# analytics/chunking.py
+"""Chunked analysis for long videos.
+
+One generate_content call over a multi-hour video runs into token limits and
+loses timestamp accuracy. Long (already reduced) clips are instead cut into
+overlapping windows that are uploaded and analyzed in parallel. Each window's
+timestamps are shifted back to original video time, and the per-window JSON
+is merged into one result: event lists are concatenated and deduplicated
+across the overlaps, timelines are interleaved, peaks take the maximum and
+averages are weighted by window length.
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import preprocess_config
+from .gemini_files import get_video_part, hash_file, valid_for_job
+from .motion_gate import video_duration
+from .preprocess import PREPROCESSED_DIR, PreprocessedVideo, format_timestamp, parse_timestamp, reduce_video
+from .structured import parse_json
+
+# --- Configuration ---
+CHUNKING_MIN_DURATION = 40 * 60  # clips at least this long (after reduction) are chunked
+WINDOW_SECONDS = 10 * 60
+OVERLAP_SECONDS = 30
+MAX_WINDOW_WORKERS = 4
+# Two events in neighbouring windows are the same if their text matches this
+# closely and their timestamps are within the overlap of each other
+TEXT_SIMILARITY_THRESHOLD = 0.8
+
+_window_locks: Dict[str, threading.Lock] = {}
+_window_locks_guard = threading.Lock()
+
+
+def is_long_video(video_path: str) -> bool:
+    return video_duration(video_path) >= CHUNKING_MIN_DURATION
+
+
+def plan_windows(duration: float, window: float = WINDOW_SECONDS, overlap: float = OVERLAP_SECONDS) -> List[Tuple[float, float]]:
+    """Split [0, duration] into windows of `window` seconds overlapping by `overlap`."""
+    windows = []
+    start = 0.0
+    while True:
+        end = min(duration, start + window)
+        windows.append((start, end))
+        if end >= duration:
+            return windows
+        start = end - overlap
+
+
+def cut_window(video_path: str, start: float, end: float) -> str:
+    """Encode [start, end) of `video_path` as its own clip, cached on disk."""
+    output_path = os.path.join(PREPROCESSED_DIR, f"{hash_file(video_path)[:32]}_w{int(start)}-{int(end)}.mp4")
+    with _window_locks_guard:
+        lock = _window_locks.setdefault(output_path, threading.Lock())
+    with lock:
+        if not os.path.exists(output_path):
+            os.makedirs(PREPROCESSED_DIR, exist_ok=True)
+            tmp_path = output_path.replace(".mp4", ".tmp.mp4")
+            reduce_video(video_path, tmp_path, preprocess_config, keep_times=[(start, end)])
+            os.replace(tmp_path, output_path)
+    return output_path
+
+
+# --- Timestamp shifting ---
+def shift_timestamps(data: Any, to_original: Callable[[float], float]) -> Any:
+    """Return a copy of parsed JSON with every HH:MM:SS string mapped through `to_original`."""
+    if isinstance(data, dict):
+        return {key: shift_timestamps(value, to_original) for key, value in data.items()}
+    if isinstance(data, list):
+        return [shift_timestamps(item, to_original) for item in data]
+    if isinstance(data, str):
+        seconds = parse_timestamp(data)
+        if seconds is not None:
+            return format_timestamp(to_original(seconds))
+    return data
+
+
+# --- Merging ---
+def _event_time(item: Dict[str, Any]) -> Optional[float]:
+    for key in ("timestamp", "start"):
+        if isinstance(item.get(key), str):
+            return parse_timestamp(item[key])
+    return None
+
+
+def _event_text(item: Dict[str, Any]) -> str:
+    return " ".join(
+        str(value).strip().lower() for value in item.values()
+        if isinstance(value, str) and parse_timestamp(value) is None
+    )
+
+
+def _is_duplicate(a: Dict[str, Any], b: Dict[str, Any], tolerance: float) -> bool:
+    time_a, time_b = _event_time(a), _event_time(b)
+    if time_a is None or time_b is None:
+        return a == b
+    text_a, text_b = _event_text(a), _event_text(b)
+    if not text_a and not text_b:
+        # timeline samples: only the same instant counts as a duplicate
+        return abs(time_a - time_b) <= 1
+    if abs(time_a - time_b) > tolerance:
+        return False
+    return text_a == text_b or SequenceMatcher(None, text_a, text_b).ratio() >= TEXT_SIMILARITY_THRESHOLD
+
+
+def _merge_list(lists: List[list], tolerance: float) -> list:
+    items = [item for items in lists for item in items]
+    if all(isinstance(item, str) for item in items):
+        # e.g. PeakOccupancy.timestamps
+        return sorted(set(items), key=lambda s: (parse_timestamp(s) is None, parse_timestamp(s) or 0, s))
+    items.sort(key=lambda item: _event_time(item) if isinstance(item, dict) and _event_time(item) is not None else float("inf"))
+    merged: list = []
+    for item in items:
+        if isinstance(item, dict) and any(isinstance(kept, dict) and _is_duplicate(kept, item, tolerance) for kept in merged[-20:]):
+            continue
+        merged.append(item)
+    return merged
+
+
+def _merge_peak(values: List[Dict[str, Any]]) -> Dict[str, Any]:
+    numeric_key = next((k for k, v in values[0].items() if isinstance(v, (int, float))), None)
+    if numeric_key is None:
+        return values[0]
+    peak = max(v.get(numeric_key, 0) or 0 for v in values)
+    tied = [v for v in values if (v.get(numeric_key, 0) or 0) == peak]
+    merged = dict(tied[0])
+    if all(isinstance(v.get("timestamps"), list) for v in tied):
+        merged["timestamps"] = _merge_list([v["timestamps"] for v in tied], 0)
+    return merged
+
+
+def _merge_average(values: List[Dict[str, Any]], weights: List[float]) -> Dict[str, Any]:
+    merged = dict(values[0])
+    for key, value in values[0].items():
+        if isinstance(value, (int, float)):
+            pairs = [(v[key], w) for v, w in zip(values, weights) if isinstance(v.get(key), (int, float))]
+            total = sum(w for _, w in pairs)
+            merged[key] = round(sum(x * w for x, w in pairs) / total, 2) if total else value
+    return merged
+
+
+def _merge(values: List[Any], weights: List[float], key: str, tolerance: float) -> Any:
+    pairs = [(v, w) for v, w in zip(values, weights) if v is not None]
+    if not pairs:
+        return None
+    values, weights = [v for v, _ in pairs], [w for _, w in pairs]
+    first = values[0]
+    if isinstance(first, dict) and all(isinstance(v, dict) for v in values):
+        if key.startswith("Peak"):
+            return _merge_peak(values)
+        if key.startswith("Average"):
+            return _merge_average(values, weights)
+        keys = list(dict.fromkeys(k for v in values for k in v))
+        return {k: _merge([v.get(k) for v in values], weights, k, tolerance) for k in keys}
+    if isinstance(first, list) and all(isinstance(v, list) for v in values):
+        return _merge_list(values, tolerance)
+    return first
+
+
+def merge_window_results(results: List[Dict[str, Any]], weights: List[float], tolerance: float = OVERLAP_SECONDS) -> Dict[str, Any]:
+    """Merge per-window JSON results that already use original-video timestamps."""
+    return _merge(results, weights, "", tolerance)
+
+
+# --- Chunked analysis ---
+def analyze_chunked(prepared: PreprocessedVideo, prompt: str, generate: Callable[[Any, str], str],
+                    upload_timeout: float = 90) -> str:
+    """Analyze `prepared` window by window and return the merged JSON text.
+
+    `generate(active_file, prompt)` runs one model call; windows whose answer
+    is not valid JSON are reported in a trailing note instead of being merged.
+    """
+    windows = plan_windows(video_duration(prepared.path))
+    print(f"Analyzing {os.path.basename(prepared.source_path)} in {len(windows)} windows")
+
+    def run_window(window: Tuple[float, float]) -> str:
+        clip_path = cut_window(prepared.path, *window)
+        # each window has its own upload, used by this one call
+        active_file = get_video_part(clip_path, mime_type="video/mp4", timeout=upload_timeout,
+                                     valid_for=valid_for_job(window[1] - window[0]))
+        return generate(active_file, prompt)
+
+    with ThreadPoolExecutor(max_workers=MAX_WINDOW_WORKERS) as pool:
+        texts = list(pool.map(run_window, windows))
+
+    parsed, weights, failed = [], [], []
+    for (start, end), text in zip(windows, texts):
+        try:
+            data, _ = parse_json(text)
+        except ValueError:
+            failed.append((start, end, text))
+            continue
+        parsed.append(shift_timestamps(data, lambda s, start=start: prepared.timestamp_map.to_original(start + s)))
+        weights.append(end - start)
+
+    if not parsed:
+        return "\n\n".join(f"[{format_timestamp(s)} - {format_timestamp(e)}]\n{t}" for s, e, t in failed)
+
+    merged = json.dumps(merge_window_results(parsed, weights), indent=2, ensure_ascii=False)
+    if failed:
+        spans = ", ".join(f"{format_timestamp(s)}-{format_timestamp(e)}" for s, e, _ in failed)
+        merged += f"\n\n(Windows without parseable output, not merged: {spans})"
+    return merged
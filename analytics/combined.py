@@ -0,0 +1,83 @@
+# analytics/combined.py
+"""Combined multi-scope mode: one model call covering several analytics.
+
+The per-analytic prompts share the same KCSI preamble and differ only in their
+scope instructions and output schema. This module stitches a chosen subset of
+them into a single request with one merged JSON schema, then splits the answer
+back into per-analytic results shaped exactly like the single-scope ones.
+"""
+import json
+import re
+from typing import Dict, Iterable, List, Tuple
+
+from .prompts import ANALYTIC_PROMPTS
+from .structured import OUTPUT_MARKER, parse_json
+
+COMBINED_PREAMBLE = (
+    "You are the Kitchen and Cafeteria Security Incharge (KCSI) of the US President, "
+    "reviewing the kitchen and cafeteria CCTV footage.\n"
+    "Watch the video once and answer **only** from it, covering every scope section below, "
+    "with consistently accurate timestamps."
+)
+
+
+def split_prompt(prompt: str) -> Tuple[str, str, str]:
+    """Split a single-scope prompt into (scope instructions, schema body, root key).
+
+    The first line is the shared role preamble and is dropped; the schema body
+    is the JSON object without its outer braces.
+    """
+    head, _, schema = prompt.partition(OUTPUT_MARKER)
+    instructions = head.split("\n", 1)[1].strip() if "\n" in head else ""
+    schema = schema.strip()
+    root_key = re.search(r'"(\w+)"\s*:', schema).group(1)
+    body = schema[schema.index("{") + 1:schema.rindex("}")].strip("\n")
+    return instructions, body, root_key
+
+
+def root_key_for(name: str) -> str:
+    return split_prompt(ANALYTIC_PROMPTS[name])[2]
+
+
+def build_combined_prompt(names: Iterable[str]) -> str:
+    """Build one prompt covering every analytic in `names` with a merged output schema."""
+    sections: List[str] = []
+    bodies: List[str] = []
+    root_keys: List[str] = []
+    for name in names:
+        instructions, body, root_key = split_prompt(ANALYTIC_PROMPTS[name])
+        sections.append(f"### {name.replace('_', ' ').title()}\n{instructions}")
+        bodies.append(body)
+        root_keys.append(root_key)
+
+    keys = ", ".join(f'"{key}"' for key in root_keys)
+    return (
+        f"{COMBINED_PREAMBLE}\n\n"
+        + "\n\n".join(sections)
+        + f"\n\n{OUTPUT_MARKER}\n"
+        + f"Return one JSON object whose top-level keys are exactly: {keys}.\n"
+        + "{\n" + ",\n".join(bodies) + "\n}\n"
+    )
+
+
+def split_combined_response(text: str, names: Iterable[str]) -> Dict[str, str]:
+    """Split a combined answer into {analytic: result_text}.
+
+    Each result is the JSON for that analytic's own root key. If the answer
+    can't be parsed, every analytic gets the raw text so nothing is lost.
+    """
+    names = list(names)
+    try:
+        data, _ = parse_json(text)
+    except ValueError as e:
+        print(f"Combined response is not valid JSON ({e}); returning raw text to every analytic.")
+        return {name: text for name in names}
+
+    results = {}
+    for name in names:
+        root_key = root_key_for(name)
+        if root_key in data:
+            results[name] = json.dumps({root_key: data[root_key]}, indent=2, ensure_ascii=False)
+        else:
+            results[name] = f"Combined response has no '{root_key}' section."
+    return results
@@ -0,0 +1,150 @@
+# analytics/context_cache.py
+"""Explicit context caching of an ACTIVE video across several prompts.
+
+Without it, each of the analytics run on a video pays for the video's input
+tokens again. A fan-out over several prompts instead opens a `session()`: the
+video plus the shared KCSI role preamble are stored once as cached content,
+every prompt of the session runs against that cache, its TTL is extended in
+the background while the session lasts, and the cache is deleted when the
+last session using it ends.
+
+Inline clips (see gemini_files.get_video_part) are cached the same way,
+keyed by their bytes instead of a file name.
+
+Creation goes through gemini_client, so it works the same against the real
+API and the offline stand-in. If a cache can't be created (e.g. a clip too
+short for the minimum cacheable size), the session yields None and callers
+send the file with each prompt as before.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from config import context_cache_config
+from . import gemini_client
+from .gemini_files import describe_video_part
+from .metrics import metrics
+
+SYSTEM_INSTRUCTION = (
+    "You are the Kitchen and Cafeteria Security Incharge (KCSI) of the US President, "
+    "reviewing the kitchen and cafeteria CCTV footage provided in this context. "
+    "Answer only from that video, with consistently accurate timestamps."
+)
+# Every analytic prompt opens with a variant of this role line; it is replaced by SYSTEM_INSTRUCTION
+PREAMBLE_PREFIX = "You are the Kitchen and Cafeteria Security Incharge"
+
+
+def strip_preamble(prompt: str) -> str:
+    """The prompt without its role line, which the cached system instruction already covers."""
+    first, _, rest = prompt.partition("\n")
+    return rest.lstrip("\n") if first.startswith(PREAMBLE_PREFIX) and rest.strip() else prompt
+
+
+def _video_key(active_file):
+    inline = getattr(active_file, "inline_data", None)
+    # bytes cache their hash, so keying an inline clip costs one pass over it per Part
+    return ("inline", len(inline.data), hash(inline.data)) if inline is not None else active_file.name
+
+
+class _Entry:
+    def __init__(self, name: Optional[str]):
+        self.name = name
+        self.users = 0
+        self.timer: Optional[threading.Timer] = None
+
+
+class ContextCacheManager:
+    """Reference-counted cached contents, one per (model, uploaded file or inline clip)."""
+
+    def __init__(self, ttl_seconds: float, delete_when_done: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.delete_when_done = delete_when_done
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, _Entry] = {}
+        self._key_locks: Dict[tuple, threading.Lock] = {}
+
+    def _ttl(self) -> str:
+        return f"{int(self.ttl_seconds)}s"
+
+    def _create(self, model: str, active_file) -> Optional[str]:
+        try:
+            with metrics.timed("cache_create"):
+                cache = gemini_client.create_cache(model, [active_file], SYSTEM_INSTRUCTION, self._ttl())
+        except Exception as e:
+            print(f"Context cache for {describe_video_part(active_file)} not created, sending the video with each prompt: {e}")
+            return None
+        print(f"Created context cache {cache.name} for {describe_video_part(active_file)} (ttl {self._ttl()})")
+        return cache.name
+
+    def _schedule_refresh(self, key: tuple, entry: _Entry):
+        # extend the TTL at half-life so a long fan-out never outlives its cache
+        entry.timer = threading.Timer(self.ttl_seconds / 2, self._refresh, args=(key, entry))
+        entry.timer.daemon = True
+        entry.timer.start()
+
+    def _refresh(self, key: tuple, entry: _Entry):
+        with self._lock:
+            if self._entries.get(key) is not entry or not entry.users:
+                return
+        try:
+            gemini_client.update_cache(entry.name, self._ttl())
+        except Exception as e:
+            print(f"Could not extend context cache {entry.name}: {e}")
+        with self._lock:
+            if self._entries.get(key) is entry and entry.users:
+                self._schedule_refresh(key, entry)
+
+    def acquire(self, model: str, active_file) -> Optional[str]:
+        """Return the cache name for `active_file`, creating it on first use."""
+        key = (model, _video_key(active_file))
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.users += 1
+                    return entry.name
+            entry = _Entry(self._create(model, active_file))
+            entry.users = 1
+            with self._lock:
+                self._entries[key] = entry
+            if entry.name:
+                self._schedule_refresh(key, entry)
+            return entry.name
+
+    def release(self, model: str, active_file):
+        key = (model, _video_key(active_file))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.users -= 1
+            if entry.users > 0:
+                return
+            del self._entries[key]
+        if entry.timer is not None:
+            entry.timer.cancel()
+        if entry.name and self.delete_when_done:
+            try:
+                gemini_client.delete_cache(entry.name)
+            except Exception as e:
+                # it still expires on its own at the end of the TTL
+                print(f"Could not delete context cache {entry.name}: {e}")
+
+    @contextmanager
+    def session(self, model: str, active_file, prompt_count: int) -> Iterator[Optional[str]]:
+        """Yield a cache name to run `prompt_count` prompts against, or None to go uncached."""
+        if not context_cache_config["enabled"] or prompt_count < context_cache_config["min_prompts"]:
+            yield None
+            return
+        name = self.acquire(model, active_file)
+        try:
+            yield name
+        finally:
+            self.release(model, active_file)
+
+
+context_caches = ContextCacheManager(
+    context_cache_config["ttl_seconds"], context_cache_config["delete_when_done"]
+)
@@ -0,0 +1,227 @@
+# analytics/face_index.py
+"""Gallery index backends for the face database.
+
+The face database talks to its gallery through the small part of the
+ChromaDB collection API it uses: `add`, `delete`, `get`, `query` and `count`,
+with Chroma's argument names and result shapes. GalleryIndex spells that
+interface out, and there are two implementations:
+
+- ChromaIndex: a persistent ChromaDB collection (HNSW, the original backend);
+- NumpyIndex: every embedding in one contiguous float32/float16 matrix. A
+  batch of probes is answered exactly with one matrix multiply and a
+  partial sort. The matrix is stored as a `.npy` file and opened memory-mapped,
+  so opening the index costs no copy and pages are loaded as queries touch
+  them. For galleries of a few thousand 512-d vectors this is faster than
+  HNSW and has no approximation error.
+
+Select one with face_index_config["backend"]. Both report distances in the
+same space ("l2" = squared euclidean, Chroma's default, or "cosine"), so
+MATCH_THRESHOLD means the same thing whichever backend is used.
+"""
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+COLLECTION_NAME = "face-database-facenet"
+
+
+class GalleryIndex(ABC):
+    """Interface of a face gallery; arguments and results follow chromadb.Collection."""
+
+    @abstractmethod
+    def add(self, ids: List[str], embeddings: List[Sequence[float]], metadatas: List[Dict[str, Any]]):
+        """Store new records; the ids must not be in the gallery yet."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Remove the records with these ids; unknown ids are ignored."""
+
+    @abstractmethod
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            include: Sequence[str] = ("metadatas",)) -> Dict[str, Any]:
+        """{"ids": [...], "metadatas": [...]} of the matching records (all if no filter)."""
+
+    @abstractmethod
+    def query(self, query_embeddings: List[Sequence[float]], n_results: int = 1,
+              include: Sequence[str] = ("metadatas", "distances")) -> Dict[str, Any]:
+        """Top `n_results` per probe: {"ids": [[...], ...], "distances": [[...], ...], "metadatas": [[...], ...]}."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of records in the gallery."""
+
+
+class ChromaIndex(GalleryIndex):
+    """A persistent ChromaDB collection."""
+
+    def __init__(self, path: str, space: str = "l2"):
+        import chromadb
+
+        os.makedirs(path, exist_ok=True)
+        self.client = chromadb.PersistentClient(path=path)
+        # Chroma defaults to l2; the space can only be chosen when the collection is first created
+        metadata = {"hnsw:space": space} if space != "l2" else None
+        self.collection = self.client.get_or_create_collection(name=COLLECTION_NAME, metadata=metadata)
+
+    def add(self, ids, embeddings, metadatas):
+        self.collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def get(self, ids=None, where=None, include=("metadatas",)):
+        return self.collection.get(ids=ids, where=where, include=list(include))
+
+    def query(self, query_embeddings, n_results=1, include=("metadatas", "distances")):
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, include=list(include))
+
+    def count(self) -> int:
+        return self.collection.count()
+
+
+class NumpyIndex(GalleryIndex):
+    """Exact in-memory index over a memory-mapped `.npy` embedding matrix.
+
+    `path` is a directory holding embeddings.npy (N x dim) and records.json
+    (ids and metadatas in row order). Writes rewrite both files atomically;
+    queries read a consistent snapshot without locking.
+    """
+
+    def __init__(self, path: str, space: str = "l2", dtype: str = "float32"):
+        if space not in ("l2", "cosine"):
+            raise ValueError(f"space must be 'l2' or 'cosine', got {space!r}")
+        self.path = path
+        self.space = space
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._matrix_path = os.path.join(path, "embeddings.npy")
+        self._records_path = os.path.join(path, "records.json")
+        self._load()
+
+    # --- storage ---
+    def _load(self):
+        ids: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        matrix = None
+        if os.path.exists(self._records_path) and os.path.exists(self._matrix_path):
+            with open(self._records_path, "r", encoding="utf-8") as f:
+                records = json.load(f)
+            ids, metadatas = records["ids"], records["metadatas"]
+            matrix = np.load(self._matrix_path, mmap_mode="r")
+            if matrix.shape[0] != len(ids):
+                print(f"Warning: face index {self.path} is inconsistent ({matrix.shape[0]} rows, {len(ids)} ids); starting empty")
+                ids, metadatas, matrix = [], [], None
+            elif not ids:
+                # an emptied gallery is saved as a 0-row matrix; start from no matrix so any dim can be added
+                matrix = None
+        self._set(ids, metadatas, matrix)
+
+    def _set(self, ids: List[str], metadatas: List[Dict[str, Any]], matrix: Optional[np.ndarray]):
+        norms = None
+        if matrix is not None and len(ids):
+            norms = np.linalg.norm(np.asarray(matrix, dtype=np.float32), axis=1)
+        # swapped in one assignment so concurrent queries see either the old or the new state
+        self._state = (ids, metadatas, matrix, norms, {record_id: row for row, record_id in enumerate(ids)})
+
+    def _save(self, ids: List[str], metadatas: List[Dict[str, Any]], matrix: Optional[np.ndarray]):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_matrix = f"{self._matrix_path}.tmp.npy"
+        np.save(tmp_matrix, matrix if matrix is not None else np.zeros((0, 0), dtype=self.dtype))
+        os.replace(tmp_matrix, self._matrix_path)
+        tmp_records = f"{self._records_path}.tmp"
+        with open(tmp_records, "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "metadatas": metadatas}, f)
+        os.replace(tmp_records, self._records_path)
+        # re-open memory-mapped so the written matrix isn't also held in memory
+        self._set(ids, metadatas, np.load(self._matrix_path, mmap_mode="r") if ids else None)
+
+    # --- writes ---
+    def add(self, ids, embeddings, metadatas):
+        if not ids:
+            return
+        new_rows = np.asarray(embeddings, dtype=self.dtype)
+        with self._lock:
+            old_ids, old_metadatas, matrix, _, rows = self._state
+            if matrix is not None and new_rows.shape[1:] != matrix.shape[1:]:
+                raise ValueError(f"embeddings of shape {new_rows.shape[1:]} don't fit the face index of shape {matrix.shape[1:]}")
+            duplicates = [record_id for record_id in ids if record_id in rows]
+            if duplicates:
+                raise ValueError(f"ids already in the face index: {', '.join(duplicates[:5])}")
+            combined = new_rows if matrix is None else np.concatenate([np.asarray(matrix), new_rows])
+            self._save(old_ids + list(ids), old_metadatas + [dict(m or {}) for m in metadatas], combined)
+
+    def delete(self, ids):
+        with self._lock:
+            old_ids, old_metadatas, matrix, _, rows = self._state
+            drop = {rows[record_id] for record_id in ids if record_id in rows}
+            if not drop:
+                return
+            keep = [row for row in range(len(old_ids)) if row not in drop]
+            self._save([old_ids[row] for row in keep], [old_metadatas[row] for row in keep],
+                       np.asarray(matrix)[keep] if keep else None)
+
+    # --- reads ---
+    @staticmethod
+    def _matches(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+        # only the plain {"field": value} equality filters the face database uses
+        return not where or all(metadata.get(key) == value for key, value in where.items())
+
+    def get(self, ids=None, where=None, include=("metadatas",)):
+        all_ids, metadatas, matrix, _, rows = self._state
+        selected = [rows[record_id] for record_id in ids if record_id in rows] if ids is not None else range(len(all_ids))
+        selected = [row for row in selected if self._matches(metadatas[row], where)]
+        result: Dict[str, Any] = {"ids": [all_ids[row] for row in selected]}
+        if "metadatas" in include:
+            result["metadatas"] = [metadatas[row] for row in selected]
+        if "embeddings" in include:
+            result["embeddings"] = np.asarray(matrix[selected], dtype=np.float32) if selected else np.zeros((0, 0), np.float32)
+        return result
+
+    def query(self, query_embeddings, n_results=1, include=("metadatas", "distances")):
+        all_ids, metadatas, matrix, norms, _ = self._state
+        probes = np.asarray(query_embeddings, dtype=np.float32)
+        if probes.ndim == 1:
+            probes = probes[None, :]
+        k = min(n_results, len(all_ids))
+        if k == 0:
+            return {"ids": [[] for _ in probes], "distances": [[] for _ in probes], "metadatas": [[] for _ in probes]}
+
+        # one (probes x gallery) product answers every probe
+        dots = probes @ np.asarray(matrix, dtype=np.float32).T
+        probe_norms = np.linalg.norm(probes, axis=1)
+        if self.space == "cosine":
+            distances = 1.0 - dots / np.maximum(probe_norms[:, None] * norms[None, :], 1e-12)
+        else:
+            distances = np.maximum(probe_norms[:, None] ** 2 + norms[None, :] ** 2 - 2.0 * dots, 0.0)
+
+        if k < len(all_ids):
+            top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(len(all_ids)), (len(probes), 1))
+        top_distances = np.take_along_axis(distances, top, axis=1)
+        order = np.argsort(top_distances, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_distances = np.take_along_axis(top_distances, order, axis=1)
+
+        result: Dict[str, Any] = {"ids": [[all_ids[row] for row in probe_rows] for probe_rows in top]}
+        if "distances" in include:
+            result["distances"] = top_distances.tolist()
+        if "metadatas" in include:
+            result["metadatas"] = [[metadatas[row] for row in probe_rows] for probe_rows in top]
+        return result
+
+    def count(self) -> int:
+        return len(self._state[0])
+
+
+def open_index(backend: str, path: str, space: str = "l2", dtype: str = "float32") -> GalleryIndex:
+    """The gallery backend named in face_index_config, stored under `path`."""
+    if backend == "chroma":
+        return ChromaIndex(path, space)
+    if backend == "numpy":
+        return NumpyIndex(path, space, dtype)
+    raise ValueError(f"Unknown face index backend {backend!r} (choose 'chroma' or 'numpy')")
@@ -1,125 +1,400 @@
 # analytics/face_recognition.py
+# The FaceNet weights, the MTCNN detector (TensorFlow) and ChromaDB are loaded on
+# first use (or by warm_up() in the background), not at import, so building the
+# UI doesn't wait for them.
+import hashlib
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from uuid import uuid4
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import gradio as gr
-import chromadb
 from PIL import Image
 import numpy as np
-import torch
-from facenet_pytorch import InceptionResnetV1
-from mtcnn import MTCNN
 import cv2
 
+from config import face_index_config
+from .face_index import open_index
+from .metrics import metrics
+
 # --- Configuration ---
 EMBEDDING_MODEL = "FaceNet"
 DETECTOR_BACKEND = "mtcnn"
 IMAGE_SIZE = (160, 160)
+# Cosine distance is used by default. Lower is better. 0 = identical.
+MATCH_THRESHOLD = 0.4  # Common threshold for FaceNet with VGGFace2
+# Face crops per InceptionResnetV1 forward pass; lower it if the GPU runs out of memory
+EMBEDDING_BATCH_SIZE = 64
+# Threads decoding image files before detection
+IMAGE_LOAD_WORKERS = 4
+# Images per MTCNN call (and decoded at once); MTCNN pads a batch to its largest image
+DETECT_BATCH_SIZE = 16
+# Images are downscaled to this longest side for detection; crops are still cut from the full image
+DETECT_MAX_SIDE = 1280
 # Correctly define the path relative to this script's location
-VECTOR_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "face_vector_db")
+VECTOR_DB_PATH = os.path.join(
+    os.environ.get("ANALYTICS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"), "face_vector_db"
+)
 IDENTITY_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "registered_faces")
+# registered_faces/ file -> (size, mtime, sha256, record id); lets startup skip unchanged images.
+# This is the chroma backend's manifest; other backends get their own (see _manifest_path).
+FACE_MANIFEST_PATH = os.path.join(os.path.dirname(VECTOR_DB_PATH), "face_manifest.json")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+# Images embedded and written to the collection per step of a sync
+SYNC_CHUNK_SIZE = 256
 
 # --- Device & Model Initialization ---
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-print(f"Running on device: {device}")
-
-# InceptionResnetV1 from facenet-pytorch outputs 512-d vectors
-identity_detector = InceptionResnetV1(pretrained="vggface2").eval().to(device)
-
-# MTCNN from `mtcnn` package (detect_faces)
-face_detector = MTCNN()
+# torch is only imported once a face is actually processed, so opening the tab stays cheap
+_device = None
+_models = None
+_face_db = None
+_init_lock = threading.Lock()
+
+
+def get_device() -> "torch.device":
+    """CUDA if available, else CPU (importing torch on first call)."""
+    global _device
+    if _device is None:
+        import torch
+
+        _device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    return _device
+
+
+def get_models():
+    """(identity_detector, face_detector), loaded once on first use."""
+    global _models
+    with _init_lock:
+        if _models is None:
+            from facenet_pytorch import InceptionResnetV1
+            from mtcnn import MTCNN
+
+            device = get_device()
+            print(f"Running on device: {device}")
+            with metrics.timed("warm_up", component="facenet"):
+                # InceptionResnetV1 from facenet-pytorch outputs 512-d vectors
+                identity_detector = InceptionResnetV1(pretrained="vggface2").eval().to(device)
+            with metrics.timed("warm_up", component="mtcnn"):
+                # MTCNN from `mtcnn` package (detect_faces)
+                face_detector = MTCNN()
+            _models = (identity_detector, face_detector)
+        return _models
+
+
+def get_face_db() -> "Database":
+    """The face database, opened (and synced with registered_faces/) on first use."""
+    global _face_db
+    identity_detector, face_detector = get_models()
+    with _init_lock:
+        if _face_db is None:
+            with metrics.timed("warm_up", component="face_db"):
+                _face_db = Database(db_path=VECTOR_DB_PATH, model=identity_detector, face_detector=face_detector)
+        return _face_db
+
+
+def warm_up():
+    """Load the models and the database now, e.g. from a background thread at startup."""
+    get_face_db()
 
 # --- Embedding Function ---
 class FaceNetEmbeddingFunction:
-    def __init__(self, model: InceptionResnetV1, face_detector: MTCNN, device: torch.device):
+    def __init__(self, model: "InceptionResnetV1", face_detector: "MTCNN", device: "torch.device",
+                 batch_size: int = EMBEDDING_BATCH_SIZE, detect_batch_size: int = DETECT_BATCH_SIZE,
+                 detect_max_side: int = DETECT_MAX_SIDE):
+        import mtcnn
+
         self.model = model
         self.face_detector = face_detector
         self.device = device
-
-    def extract_face(self, img_path: str) -> (Optional[torch.Tensor], Optional[Dict[str, Any]]):
+        self.batch_size = batch_size
+        self.detect_batch_size = detect_batch_size
+        self.detect_max_side = detect_max_side
+        # mtcnn >= 1.0 detects a list of images in one pass; older releases take one image at a time
+        self._batched_detection = int(getattr(mtcnn, "__version__", "0").split(".")[0]) >= 1
+
+    @staticmethod
+    def _load_image(img_path: str) -> Optional[np.ndarray]:
         try:
-            img = Image.open(img_path).convert("RGB")
-            img_array = np.array(img)
+            return np.array(Image.open(img_path).convert("RGB"))
         except Exception as e:
             print(f"Error opening image {img_path}: {e}")
-            return None, None
-
-        faces = self.face_detector.detect_faces(img_array)
-        if not faces:
-            return None, None
-
-        box = faces[0].get("box")
-        if not box:
-            return None, faces[0]
-
+            return None
+
+    def _downscale(self, img_array: np.ndarray) -> Tuple[np.ndarray, float]:
+        """`img_array` shrunk to at most detect_max_side, and the factor it was shrunk by."""
+        height, width = img_array.shape[:2]
+        scale = self.detect_max_side / max(height, width)
+        if scale >= 1:
+            return img_array, 1.0
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        return cv2.resize(img_array, size, interpolation=cv2.INTER_AREA), scale
+
+    @staticmethod
+    def _rescale(face: Dict[str, Any], scale: float) -> Dict[str, Any]:
+        """A detection on a downscaled image, in the coordinates of the original."""
+        if scale == 1.0:
+            return face
+        face = dict(face)
+        if face.get("box"):
+            face["box"] = [int(round(v / scale)) for v in face["box"]]
+        if face.get("keypoints"):
+            face["keypoints"] = {name: tuple(int(round(v / scale)) for v in point) for name, point in face["keypoints"].items()}
+        return face
+
+    def detect(self, images: List[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        """MTCNN detections for each RGB image, in input order and full-image coordinates.
+
+        Images are detected `detect_batch_size` at a time, each downscaled to
+        `detect_max_side`, so a batch of large photos stays small in memory.
+        """
+        detections = []
+        for start in range(0, len(images), self.detect_batch_size):
+            small, scales = zip(*(self._downscale(img_array) for img_array in images[start:start + self.detect_batch_size]))
+            if self._batched_detection and len(small) > 1:
+                found = self.face_detector.detect_faces(list(small))
+            else:
+                found = [self.face_detector.detect_faces(img_array) for img_array in small]
+            detections.extend([self._rescale(face, scale) for face in faces] for faces, scale in zip(found, scales))
+        return detections
+
+    @staticmethod
+    def crop(img_array: np.ndarray, box) -> np.ndarray:
+        """The face at MTCNN `box` ([x, y, w, h]) resized to the model's input size."""
         x, y, w, h = box
-        # Crop face, ensuring coordinates are valid
+        # MTCNN boxes can start slightly outside the frame
+        x, y = max(0, x), max(0, y)
         face_img = Image.fromarray(img_array).crop((x, y, x + w, y + h))
-        face_img = face_img.resize(IMAGE_SIZE)
-        
-        # Preprocess for FaceNet model
-        face_tensor = torch.tensor(np.array(face_img)).permute(2, 0, 1).unsqueeze(0).float() / 255.0
-        face_tensor = face_tensor.to(self.device)
-        
-        meta = {"box": (x, y, w, h), **faces[0]}
-        return face_tensor, meta
-
-    def get_embedding_with_metadata(self, inputs: List[str]) -> List[Dict[str, Any]]:
+        return np.asarray(face_img.resize(IMAGE_SIZE), dtype=np.uint8)
+
+    def extract_faces(self, images: List[np.ndarray], all_faces: bool = False) -> Tuple[List[np.ndarray], List[Dict[str, Any]]]:
+        """Aligned 160x160 crops and their metadata for the faces in `images`.
+
+        Only the first (most confident) face of each image is kept unless
+        `all_faces`; each metadata dict carries the `image_index` it came from.
+        """
+        crops, metas = [], []
+        for index, (img_array, faces) in enumerate(zip(images, self.detect(images))):
+            for face in faces if all_faces else faces[:1]:
+                box = face.get("box")
+                if not box:
+                    continue
+                crops.append(self.crop(img_array, box))
+                metas.append({**face, "image_index": index})
+        return crops, metas
+
+    def embed_crops(self, crops: List[np.ndarray]) -> np.ndarray:
+        """(N, 512) embeddings of face crops, run through the model `batch_size` crops at a time."""
+        if not crops:
+            return np.zeros((0, 512), dtype=np.float32)
+        import torch
+
+        # Preprocess for FaceNet model: one uint8 NHWC array -> float NCHW batches
+        faces = torch.from_numpy(np.stack(crops)).permute(0, 3, 1, 2)
         out = []
-        for img_path in inputs:
-            face_tensor, meta = self.extract_face(img_path)
-            if face_tensor is None:
-                continue
-            with torch.no_grad():
-                emb = self.model(face_tensor).cpu().numpy().flatten().tolist()
-            out.append({
-                "embedding": emb,
-                "facial_area": meta.get("box") if meta else None,
-                "face_confidence": float(meta.get("confidence", 1.0)) if meta else 1.0,
-            })
-        return out
+        with torch.inference_mode():
+            for start in range(0, len(crops), self.batch_size):
+                batch = faces[start:start + self.batch_size].to(self.device).float() / 255.0
+                out.append(self.model(batch).cpu().numpy())
+        return np.concatenate(out)
+
+    def get_embedding_with_metadata(self, inputs: List[str], all_faces: bool = False) -> List[Dict[str, Any]]:
+        """Embeddings of the faces in image files; images without a face are left out.
+
+        Each result's `source` is the path it came from. Files are decoded and
+        detected `detect_batch_size` at a time and only their face crops are
+        kept, so a whole sync chunk is never held in memory at full resolution;
+        the crops are then embedded together.
+        """
+        crops, metas = [], []
+        with ThreadPoolExecutor(max_workers=IMAGE_LOAD_WORKERS) as pool:
+            for start in range(0, len(inputs), self.detect_batch_size):
+                chunk = inputs[start:start + self.detect_batch_size]
+                loaded = [(path, img_array) for path, img_array in zip(chunk, pool.map(self._load_image, chunk))
+                          if img_array is not None]
+                chunk_crops, chunk_metas = self.extract_faces([img_array for _, img_array in loaded], all_faces)
+                crops.extend(chunk_crops)
+                metas.extend({**meta, "source": loaded[meta["image_index"]][0]} for meta in chunk_metas)
+        with metrics.timed("face_embed"):
+            embeddings = self.embed_crops(crops)
+        return [{
+            "embedding": emb.tolist(),
+            "facial_area": meta["box"],
+            "face_confidence": float(meta.get("confidence", 1.0)),
+            "source": meta["source"],
+        } for emb, meta in zip(embeddings, metas)]
+
+# --- Registered faces manifest ---
+def _manifest_path(backend: str) -> str:
+    """Manifest of one gallery backend. Each index is described by its own, so switching
+    backends back and forth never matches one index's files against the other's record ids."""
+    if backend == "chroma":
+        return FACE_MANIFEST_PATH
+    root, ext = os.path.splitext(FACE_MANIFEST_PATH)
+    return f"{root}.{backend}{ext}"
+
+def _hash_image(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _name_from_filename(filename: str) -> str:
+    return os.path.splitext(filename)[0].split("_")[0]
+
+
+class FaceManifest:
+    """Persistent map of registered_faces/ file name -> {name, size, mtime_ns, sha256, id}."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: could not read face manifest {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {filename: dict(entry) for filename, entry in self._entries.items()}
+
+    def update(self, changes: Dict[str, Optional[Dict[str, Any]]]):
+        """Apply {filename: entry, or None to drop it} and save once."""
+        if not changes:
+            return
+        with self._lock:
+            for filename, entry in changes.items():
+                if entry is None:
+                    self._entries.pop(filename, None)
+                else:
+                    self._entries[filename] = entry
+            self._save()
 
 # --- Database wrapper ---
 class Database:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, model: "InceptionResnetV1", face_detector: "MTCNN"):
         os.makedirs(db_path, exist_ok=True)
-        
-        # FIX 1: Use PersistentClient to save the database to disk
-        self.client = chromadb.PersistentClient(path=db_path)
-        
-        # The embedding function is used outside of Chroma, so no need to pass it here
-        self.collection = self.client.get_or_create_collection(name="face-database-facenet")
-        
-        self.embedding_func = FaceNetEmbeddingFunction(model=identity_detector, face_detector=face_detector, device=device)
-        self._load_registered_faces_to_db()
 
-    def _load_registered_faces_to_db(self):
+        # Gallery backend (face_index_config); either one answers the Chroma collection calls used below.
+        # The numpy index keeps its files next to Chroma's. Each backend has its own manifest, so the
+        # first start on a backend fills it from registered_faces/ and the other index is left as it was.
+        backend = face_index_config["backend"]
+        index_path = db_path if backend == "chroma" else os.path.join(db_path, backend)
+        self.collection = open_index(backend, index_path, space=face_index_config["space"], dtype=face_index_config["dtype"])
+
+        self.embedding_func = FaceNetEmbeddingFunction(model=model, face_detector=face_detector, device=get_device())
+        self.manifest = FaceManifest(_manifest_path(backend))
+        self._sync_registered_faces()
+
+    def _sync_registered_faces(self):
+        """Bring the collection in line with registered_faces/, embedding only new or changed images.
+
+        Unchanged files are recognised from the manifest by size and mtime (or
+        content hash if only the mtime moved), and their records are checked
+        with one bulk lookup. Deleted files lose their records.
+        """
         os.makedirs(IDENTITY_FOLDER, exist_ok=True)
-        for filename in os.listdir(IDENTITY_FOLDER):
-            if filename.lower().endswith((".jpg", ".jpeg", ".png")):
-                img_path = os.path.join(IDENTITY_FOLDER, filename)
-                name = os.path.splitext(filename)[0].split("_")[0]
-
-                # FIX 2: Correctly check if a record with this name already exists
-                existing = self.collection.get(where={"name": name})
-                if existing and existing['ids']:
-                    print(f"Face '{name}' already in database. Skipping.")
+        with metrics.timed("face_sync"):
+            entries = self.manifest.entries()
+            files = {}
+            for filename in os.listdir(IDENTITY_FOLDER):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    stat = os.stat(os.path.join(IDENTITY_FOLDER, filename))
+                    files[filename] = (stat.st_size, stat.st_mtime_ns)
+
+            record_ids = [entry["id"] for entry in entries.values() if entry.get("id")]
+            live_ids = set(self.collection.get(ids=record_ids, include=[])["ids"]) if record_ids else set()
+
+            def is_current(entry: Optional[Dict[str, Any]]) -> bool:
+                # id None: no face in the image, or its record was deleted on purpose
+                return entry is not None and (entry.get("id") is None or entry["id"] in live_ids)
+
+            changes: Dict[str, Optional[Dict[str, Any]]] = {}
+            pending: Dict[str, Dict[str, Any]] = {}
+            stale_ids = []
+            for filename, (size, mtime_ns) in files.items():
+                entry = entries.get(filename)
+                if is_current(entry) and entry["size"] == size and entry["mtime_ns"] == mtime_ns:
                     continue
-
-                embs = self.embedding_func.get_embedding_with_metadata([img_path])
-                if not embs:
-                    print(f"No face detected in {filename}. Skipping.")
+                digest = _hash_image(os.path.join(IDENTITY_FOLDER, filename))
+                if is_current(entry) and entry["sha256"] == digest:
+                    changes[filename] = {**entry, "size": size, "mtime_ns": mtime_ns}
                     continue
-
-                emb_data = embs[0]
-                new_id = str(uuid4())
-                self.collection.add(
-                    ids=[new_id],
-                    embeddings=[emb_data["embedding"]],
-                    metadatas=[{"name": name, "facial_area": str(emb_data["facial_area"]), "face_confidence": emb_data["face_confidence"]}],
-                )
-                print(f"Loaded face '{name}' from {filename} into database with id={new_id}")
+                if entry and entry.get("id") in live_ids:
+                    stale_ids.append(entry["id"])
+                name = entry["name"] if entry else _name_from_filename(filename)
+                pending[filename] = {"name": name, "size": size, "mtime_ns": mtime_ns, "sha256": digest, "id": None}
+            for filename, entry in entries.items():
+                if filename not in files:
+                    changes[filename] = None
+                    if entry.get("id") in live_ids:
+                        stale_ids.append(entry["id"])
+
+            self._adopt_unlisted_records([f for f in pending if f not in entries], pending, changes, claimed=live_ids)
+            if stale_ids:
+                self.collection.delete(ids=stale_ids)
+            self.manifest.update(changes)
+
+            added = 0
+            filenames = list(pending)
+            for start in range(0, len(filenames), SYNC_CHUNK_SIZE):
+                chunk = filenames[start:start + SYNC_CHUNK_SIZE]
+                added += self._embed_and_add({filename: pending[filename] for filename in chunk})
+        if pending or stale_ids:
+            print(f"Face database synced: {added} added, {len(stale_ids)} removed, "
+                  f"{len(files) - len(pending)} unchanged, {len(pending) - added} without a face")
+
+    def _adopt_unlisted_records(self, unlisted: List[str], pending: Dict[str, Dict[str, Any]],
+                                changes: Dict[str, Optional[Dict[str, Any]]], claimed: set):
+        """Link files new to the manifest to records of the same name that no entry owns (databases built before the manifest)."""
+        if not unlisted:
+            return
+        existing = self.collection.get(include=["metadatas"])
+        owner_of_name: Dict[str, str] = {}
+        for record_id, metadata in zip(existing["ids"], existing["metadatas"]):
+            name = (metadata or {}).get("name")
+            if record_id not in claimed and name and name not in owner_of_name:
+                owner_of_name[name] = record_id
+        for filename in unlisted:
+            record_id = owner_of_name.pop(pending[filename]["name"], None)
+            if record_id is not None:
+                changes[filename] = {**pending.pop(filename), "id": record_id}
+
+    def _embed_and_add(self, pending: Dict[str, Dict[str, Any]]) -> int:
+        paths = {os.path.join(IDENTITY_FOLDER, filename): filename for filename in pending}
+        embs = self.embedding_func.get_embedding_with_metadata(list(paths))
+        ids, embeddings, metadatas = [], [], []
+        changes: Dict[str, Optional[Dict[str, Any]]] = {filename: dict(entry) for filename, entry in pending.items()}
+        for emb_data in embs:
+            filename = paths[emb_data["source"]]
+            record_id = str(uuid4())
+            changes[filename]["id"] = record_id
+            ids.append(record_id)
+            embeddings.append(emb_data["embedding"])
+            metadatas.append({"name": pending[filename]["name"], "facial_area": str(emb_data["facial_area"]),
+                              "face_confidence": emb_data["face_confidence"]})
+        for filename, entry in changes.items():
+            if entry["id"] is None:
+                print(f"No face detected in {filename}. Skipping.")
+        if ids:
+            self.collection.add(ids=ids, embeddings=embeddings, metadatas=metadatas)
+        # after the add, so a crash in between re-embeds these files rather than losing them
+        self.manifest.update(changes)
+        return len(ids)
 
     def add_to_collection(self, img_path: str, metadata: Dict[str, Any]) -> str:
         try:
@@ -134,6 +409,13 @@ class Database:
                 embeddings=[emb_data["embedding"]],
                 metadatas=[{**metadata, "facial_area": str(emb_data["facial_area"]), "face_confidence": emb_data["face_confidence"]}],
             )
+            if os.path.dirname(os.path.abspath(img_path)) == os.path.abspath(IDENTITY_FOLDER):
+                # known to the next startup sync, under the name it was registered with
+                stat = os.stat(img_path)
+                self.manifest.update({os.path.basename(img_path): {
+                    "name": metadata.get("name"), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                    "sha256": _hash_image(img_path), "id": new_id,
+                }})
             return f"✅ User '{metadata.get('name', 'Unknown')}' registered successfully! id={new_id}"
         except Exception as e:
             return f"❌ Failed to register user: {e}"
@@ -162,8 +444,7 @@ class Database:
         metadata = result['metadatas'][0][0]
         record_id = result['ids'][0][0]
 
-        # Cosine distance is used by default. Lower is better. 0 = identical.
-        threshold = 0.4  # Common threshold for FaceNet with VGGFace2
+        threshold = MATCH_THRESHOLD
         verified = distance <= threshold
 
         return {
@@ -177,12 +458,14 @@ class Database:
     def delete_record(self, record_id: str) -> str:
         try:
             self.collection.delete(ids=[record_id])
+            # keep the image, but don't let the next sync bring the record back
+            self.manifest.update({filename: {**entry, "id": None}
+                                  for filename, entry in self.manifest.entries().items() if entry.get("id") == record_id})
             return f"✅ Record '{record_id}' deleted successfully."
         except Exception as e:
             return f"❌ Failed to delete record '{record_id}': {e}"
 
 # --- Gradio Handlers & UI ---
-face_db = Database(db_path=VECTOR_DB_PATH)
 
 def save_temp_image(image: Image.Image) -> str:
     temp_dir = "/tmp/gradio_face_rec"
@@ -196,6 +479,7 @@ def register_user(name: str, image: Optional[Image.Image]):
         return "❌ Name and image are required."
     
     # Check if user already exists
+    face_db = get_face_db()
     if face_db.collection.get(where={"name": name})['ids']:
         return f"❌ User '{name}' is already registered."
         
@@ -228,16 +512,21 @@ def verify_user_image(image_input: Any):
 
     temp_path = save_temp_image(image_to_process)
     try:
-        result = face_db.verify(temp_path)
+        result = get_face_db().verify(temp_path)
         return result
     finally:
         if os.path.exists(temp_path):
             os.remove(temp_path)
 
+def _identify_people_in_video(video_path: Optional[str]):
+    # face_video builds on this module, so it is imported on use
+    from .face_video import identify_people_in_video
+    return identify_people_in_video(video_path)
+
 def delete_user(record_id: str):
     if not record_id:
         return "❌ Record ID is required."
-    return face_db.delete_record(record_id)
+    return get_face_db().delete_record(record_id)
 
 def create_tab(analyze_button: gr.Button, video_player: gr.Video):
     with gr.Blocks() as face_rec_app:
@@ -251,6 +540,12 @@ def create_tab(analyze_button: gr.Button, video_player: gr.Video):
                     verify_output = gr.JSON(label="Verification Result")
             verify_button.click(fn=verify_user_image, inputs=[verify_image], outputs=[verify_output])
 
+        with gr.Tab("Identify in Video"):
+            gr.Markdown("Who appears in the selected video, and when.")
+            identify_button = gr.Button("Identify People in Selected Video", variant="primary")
+            identify_output = gr.JSON(label="Presence Intervals")
+            identify_button.click(fn=_identify_people_in_video, inputs=[video_player], outputs=[identify_output])
+
         with gr.Tab("Register New User"):
             with gr.Row():
                 with gr.Column():
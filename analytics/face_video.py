@@ -0,0 +1,233 @@
+# analytics/face_video.py
+"""Who appears in a video, and when: face identification over a whole recording.
+
+Per-frame recognition would embed and look up every face in every frame.
+Instead frames are sampled at face_video_config["sample_fps"], faces are
+detected in batches of frames and linked across frames into tracks by box
+overlap (IoU). Only the few best crops of each track (most confident, largest)
+are embedded, in one batched forward pass for the whole video, and the gallery
+is queried once for all of them. Each track takes the identity its crops agree
+on, and the tracks of an identity are merged into presence intervals.
+"""
+import heapq
+import itertools
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import face_video_config
+from .face_recognition import MATCH_THRESHOLD, get_face_db
+from .metrics import metrics
+from .preprocess import format_timestamp
+
+UNKNOWN = "unknown"
+
+
+def iou(a, b) -> float:
+    """Intersection over union of two [x, y, w, h] boxes."""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0.0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0.0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+@dataclass
+class Track:
+    track_id: int
+    box: List[float]
+    first_seen: float
+    last_seen: float
+    detections: int = 0
+    # min-heap of (quality, tiebreak, crop): the best `crops_per_track` crops seen so far
+    best_crops: List[Tuple[float, int, np.ndarray]] = field(default_factory=list)
+    name: str = UNKNOWN
+    distance: Optional[float] = None
+
+    def observe(self, seconds: float, box, quality: float, crop_of, keep: int, tiebreak: int):
+        """Extend the track; `crop_of()` is only called if the crop makes the best `keep`."""
+        self.box = list(box)
+        self.last_seen = seconds
+        self.detections += 1
+        if len(self.best_crops) < keep:
+            heapq.heappush(self.best_crops, (quality, tiebreak, crop_of()))
+        elif quality > self.best_crops[0][0]:
+            heapq.heapreplace(self.best_crops, (quality, tiebreak, crop_of()))
+
+
+class IouTracker:
+    """Greedy frame-to-frame association of detections to tracks by box overlap."""
+
+    def __init__(self, iou_threshold: float, max_gap_seconds: float, crops_per_track: int):
+        self.iou_threshold = iou_threshold
+        self.max_gap_seconds = max_gap_seconds
+        self.crops_per_track = crops_per_track
+        self.active: List[Track] = []
+        self.finished: List[Track] = []
+        self._ids = itertools.count()
+
+    def update(self, seconds: float, faces: List[Dict[str, Any]], crop_of):
+        """Feed the detections of one frame; `crop_of(face)` returns its aligned crop."""
+        # tracks unseen for too long are closed before matching
+        still_active = []
+        for track in self.active:
+            (still_active if seconds - track.last_seen <= self.max_gap_seconds else self.finished).append(track)
+        self.active = still_active
+
+        pairs = sorted(
+            ((iou(track.box, face["box"]), t, f) for t, track in enumerate(self.active) for f, face in enumerate(faces)),
+            reverse=True,
+        )
+        matched_tracks, matched_faces = set(), set()
+        for overlap, t, f in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if t in matched_tracks or f in matched_faces:
+                continue
+            matched_tracks.add(t)
+            matched_faces.add(f)
+            self._add(self.active[t], seconds, faces[f], crop_of)
+        for f, face in enumerate(faces):
+            if f not in matched_faces:
+                track = Track(next(self._ids), list(face["box"]), seconds, seconds)
+                self._add(track, seconds, face, crop_of)
+                self.active.append(track)
+
+    def _add(self, track: Track, seconds: float, face: Dict[str, Any], crop_of):
+        _, _, w, h = face["box"]
+        # confident, large faces embed best
+        quality = float(face.get("confidence", 1.0)) * min(w, h)
+        track.observe(seconds, face["box"], quality, lambda: crop_of(face), self.crops_per_track, next(self._ids))
+
+    def close(self) -> List[Track]:
+        self.finished.extend(self.active)
+        self.active = []
+        return self.finished
+
+
+def sample_frames(video_path: str, sample_fps: float):
+    """Yield (seconds, RGB frame) at about `sample_fps`, decoding only the frames that are kept."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video {video_path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1, int(round(fps / sample_fps)))
+        index = 0
+        while cap.grab():
+            if index % step == 0:
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                yield index / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            index += 1
+    finally:
+        cap.release()
+
+
+def _assign_identities(tracks: List[Track], face_db):
+    """Embed every track's best crops in one batch, query the gallery once, and vote per track."""
+    crops = [crop for track in tracks for _, _, crop in track.best_crops]
+    if not crops:
+        return
+    with metrics.timed("face_embed"):
+        embeddings = face_db.embedding_func.embed_crops(crops)
+    with metrics.timed("face_query"):
+        result = face_db.collection.query(query_embeddings=embeddings.tolist(), n_results=1, include=["metadatas", "distances"])
+
+    offset = 0
+    for track in tracks:
+        votes: Dict[str, List[float]] = {}
+        for i in range(offset, offset + len(track.best_crops)):
+            if not result["ids"][i]:
+                continue
+            distance = result["distances"][i][0]
+            if distance <= MATCH_THRESHOLD:
+                votes.setdefault((result["metadatas"][i][0] or {}).get("name") or UNKNOWN, []).append(distance)
+        offset += len(track.best_crops)
+        if votes:
+            # most crops agreeing wins; the closer match breaks ties
+            track.name, distances = max(votes.items(), key=lambda item: (len(item[1]), -min(item[1])))
+            track.distance = min(distances)
+
+
+def _intervals(spans: List[Tuple[float, float]], merge_gap: float) -> List[List[float]]:
+    merged: List[List[float]] = []
+    for start, end in sorted(spans):
+        if merged and start - merged[-1][1] <= merge_gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def identify_video(video_path: str, settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Presence intervals of every registered (and unknown) face in `video_path`."""
+    settings = {**face_video_config, **(settings or {})}
+    face_db = get_face_db()
+    embedder = face_db.embedding_func
+    tracker = IouTracker(settings["iou_threshold"], settings["max_gap_seconds"], settings["crops_per_track"])
+
+    def process(batch: List[Tuple[float, np.ndarray]]):
+        with metrics.timed("face_detect"):
+            detections = embedder.detect([frame for _, frame in batch])
+        for (seconds, frame), faces in zip(batch, detections):
+            faces = [face for face in faces if face.get("box") and face.get("confidence", 1.0) >= settings["min_confidence"]]
+            tracker.update(seconds, faces, lambda face, frame=frame: embedder.crop(frame, face["box"]))
+
+    sampled, batch, duration = 0, [], 0.0
+    for seconds, frame in sample_frames(video_path, settings["sample_fps"]):
+        batch.append((seconds, frame))
+        sampled += 1
+        duration = seconds
+        if len(batch) >= settings["detect_batch_frames"]:
+            process(batch)
+            batch = []
+    if batch:
+        process(batch)
+
+    tracks = [track for track in tracker.close() if track.detections >= settings["min_track_detections"]]
+    _assign_identities(tracks, face_db)
+
+    # a track covers at least one sampling interval, so a single sighting still has a length
+    frame_span = 1.0 / settings["sample_fps"]
+    spans: Dict[str, List[Tuple[float, float]]] = {}
+    best: Dict[str, float] = {}
+    for track in tracks:
+        spans.setdefault(track.name, []).append((track.first_seen, track.last_seen + frame_span))
+        if track.distance is not None:
+            best[track.name] = min(best.get(track.name, track.distance), track.distance)
+
+    identities = {}
+    for name, name_spans in sorted(spans.items()):
+        intervals = _intervals(name_spans, settings["max_gap_seconds"])
+        identities[name] = {
+            "intervals": [[format_timestamp(start), format_timestamp(end)] for start, end in intervals],
+            "seconds_present": round(sum(end - start for start, end in intervals), 1),
+            "tracks": len(name_spans),
+            **({"best_distance": round(best[name], 4)} if name in best else {}),
+        }
+    return {
+        "video": os.path.basename(video_path),
+        "duration": format_timestamp(duration),
+        "sampled_frames": sampled,
+        "tracks": len(tracks),
+        "embedded_crops": sum(len(track.best_crops) for track in tracks),
+        "threshold": MATCH_THRESHOLD,
+        "identities": identities,
+    }
+
+
+def identify_people_in_video(video_path: Optional[str]) -> Dict[str, Any]:
+    """Gradio handler for the selected video."""
+    if not video_path:
+        return {"error": "Please select a video first."}
+    try:
+        return identify_video(video_path)
+    except ValueError as e:
+        return {"error": str(e)}
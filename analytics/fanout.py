@@ -0,0 +1,133 @@
+# analytics/fanout.py
+"""Run several analytics on one video concurrently, from a single upload (or inline copy)."""
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Iterable, Iterator, Optional, Tuple
+
+from google.genai import errors
+
+from config import context_cache_config
+from .chunking import is_long_video
+from .combined import build_combined_prompt, split_combined_response
+from .context_cache import context_caches
+from .gemini_files import get_video_part, hash_file, valid_for_job
+from .pipeline import MODEL_NAME, UPLOAD_TIMEOUT, cached_response, generate_for_video, store_response, stream_for_video
+from .motion_gate import video_duration
+from .preprocess import prepare_video
+from .prompts import ANALYTIC_PROMPTS
+from .resilience import CircuitOpenError
+from .sampling import profile_for
+from .structured import schema_for
+
+# --- Configuration ---
+# Upper bound on concurrent generate_content calls for one video
+MAX_WORKERS = 10
+
+
+def analyze_all(video_path: str, analytics: Optional[Iterable[str]] = None,
+                max_workers: int = MAX_WORKERS, combined: bool = False,
+                refresh: bool = False, stream: bool = False) -> Iterator[Tuple[str, str]]:
+    """Upload `video_path` once and run the selected analytics in parallel.
+
+    `analytics` are keys of ANALYTIC_PROMPTS (all of them if None; nothing
+    runs for an empty selection). Yields
+    (analytic, result_text) pairs in completion order, so the caller can show
+    each result as soon as it is ready. With `combined=True` all analytics are
+    answered by a single model call (see analytics/combined.py). Cached
+    responses are returned straight away unless `refresh=True`. With
+    `stream=True` the growing text of each running analytic is yielded too;
+    the last pair yielded for an analytic is always its final result.
+    Several analytics on one upload share a context cache of the video
+    (see analytics/context_cache.py) instead of each paying for its tokens.
+    """
+    names = [name for name in (ANALYTIC_PROMPTS if analytics is None else analytics) if name in ANALYTIC_PROMPTS]
+    if not names:
+        return
+
+    if not video_path:
+        for name in names:
+            yield name, "Please upload a video to analyze."
+        return
+
+    prepared = prepare_video(video_path)
+    video_hash = hash_file(prepared.path)
+    combined_prompt = build_combined_prompt(names) if combined else None
+    if combined:
+        cached = cached_response(video_hash, combined_prompt, refresh)
+        if cached is not None:
+            yield from split_combined_response(cached, names).items()
+            return
+    else:
+        pending = []
+        for name in names:
+            cached = cached_response(video_hash, ANALYTIC_PROMPTS[name], refresh)
+            if cached is None:
+                pending.append(name)
+            else:
+                yield name, cached
+        names = pending
+        if not names:
+            return
+
+    # Analytics on one upload run `max_workers` at a time, and a context cache of it lives at least its ttl.
+    # Long videos are uploaded window by window inside generate_for_video instead.
+    active_file = None
+    if not is_long_video(prepared.path):
+        rounds = 1 if combined else -(-len(names) // max(1, max_workers))
+        valid_for = valid_for_job(video_duration(prepared.path), rounds,
+                                  at_least=0 if combined else context_cache_config["ttl_seconds"])
+        # same messages as the single-tab pipeline, so no tab is left on "Analyzing..."
+        error = None
+        try:
+            active_file = get_video_part(prepared.path, mime_type="video/mp4", timeout=UPLOAD_TIMEOUT, valid_for=valid_for)
+        except CircuitOpenError as e:
+            error = f"Gemini is currently unavailable: {e}"
+        except RuntimeError as e:
+            error = f"Upload processed but never became ACTIVE: {e}"
+        except errors.APIError as e:
+            error = f"Gemini request failed: {e}"
+        if error is not None:
+            for name in names:
+                yield name, error
+            return
+
+    if combined:
+        try:
+            text = generate_for_video(prepared, combined_prompt, active_file, schema=schema_for(names))
+            store_response(video_hash, combined_prompt, text)
+            results = split_combined_response(text, names)
+        except Exception as e:
+            results = {name: f"Analysis failed: {e}" for name in names}
+        for name in names:
+            yield name, results[name]
+        return
+
+    # workers push (analytic, text, finished) so partial output can be relayed as it arrives
+    updates: "queue.Queue[Tuple[str, str, bool]]" = queue.Queue()
+
+    def run(name: str, cache_name: Optional[str]):
+        prompt = ANALYTIC_PROMPTS[name]
+        text = None
+        try:
+            for text in stream_for_video(prepared, prompt, active_file, schema=schema_for([name]), cached_content=cache_name):
+                if stream:
+                    updates.put((name, text, False))
+            if text is not None:
+                store_response(video_hash, prompt, text)
+        except Exception as e:
+            text = f"Analysis failed: {e}"
+        updates.put((name, text or "", True))
+
+    # long videos have no single upload to cache; the session is released once every worker is done.
+    # Analytics with their own sampling profile need the video re-sampled, so they run uncached.
+    cacheable = [name for name in names if not profile_for(name)]
+    cache_session = context_caches.session(MODEL_NAME, active_file, len(cacheable)) if active_file is not None else nullcontext()
+    with cache_session as cache_name, ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(names)))) as pool:
+        for name in names:
+            pool.submit(run, name, cache_name if name in cacheable else None)
+        remaining = len(names)
+        while remaining:
+            name, text, finished = updates.get()
+            remaining -= finished
+            yield name, text
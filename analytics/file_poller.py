@@ -0,0 +1,157 @@
+# analytics/file_poller.py
+"""Shared watcher that waits for uploaded Gemini files to become ACTIVE.
+
+One asyncio loop on a daemon thread watches every pending file, so callers
+don't each park a worker thread in a sleep loop. Poll intervals start from an
+estimate based on the file size and back off geometrically; a file turning
+ACTIVE resolves its waiters on that poll, and a FAILED file errors out at once
+instead of running into the timeout.
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from . import gemini_client
+
+# --- Configuration ---
+# Rough server-side processing throughput, used to seed the first poll delay
+ESTIMATED_PROCESSING_BYTES_PER_SECOND = 20 * 1024 * 1024
+MIN_POLL_DELAY = 0.25
+MAX_POLL_DELAY = 5.0
+BACKOFF_FACTOR = 1.5
+
+FAILED_STATES = ("FAILED", 10, "10")
+
+
+class FileProcessingFailed(RuntimeError):
+    """The Files API reported FAILED; the upload itself is unusable and must be redone."""
+
+
+def _normalize_state(file_status):
+    """Return a normalized state value that's easy to compare."""
+    # try dict-like first
+    state = None
+    if isinstance(file_status, dict):
+        state = file_status.get("state") or file_status.get("status")
+    else:
+        # try attributes
+        state = getattr(file_status, "state", None) or getattr(file_status, "status", None)
+
+    # If it's bytes-like or proto enum, try to convert to int
+    if isinstance(state, (int,)):
+        return state
+    if isinstance(state, str):
+        # strip and uppercase for safety
+        s = state.strip().upper()
+        # try numeric string -> int
+        try:
+            return int(s)
+        except Exception:
+            return s
+    # fallback: return repr
+    return repr(state)
+
+
+def _is_active(norm) -> bool:
+    # Accept either string "ACTIVE" or numeric 2
+    return norm == "ACTIVE" or norm == 2 or norm == "2"
+
+
+def _file_id(file_obj) -> Optional[str]:
+    # get an identifier used by gemini_client.get_file
+    if hasattr(file_obj, "name"):
+        return getattr(file_obj, "name")
+    if isinstance(file_obj, dict) and "name" in file_obj:
+        return file_obj["name"]
+    if hasattr(file_obj, "resource_name"):
+        return getattr(file_obj, "resource_name")
+    if hasattr(file_obj, "uri"):
+        return getattr(file_obj, "uri")
+    return None
+
+
+def initial_poll_delay(size_bytes: Optional[int]) -> float:
+    """First poll delay: about a quarter of the expected processing time."""
+    if not size_bytes:
+        return MIN_POLL_DELAY
+    expected = size_bytes / ESTIMATED_PROCESSING_BYTES_PER_SECOND
+    return min(MAX_POLL_DELAY, max(MIN_POLL_DELAY, expected / 4))
+
+
+class FilePoller:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        # file id -> future shared by every caller waiting on that file
+        self._pending: Dict[str, concurrent.futures.Future] = {}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="gemini-file-poller", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def watch(self, file_obj, size_bytes: Optional[int] = None, timeout: float = 90,
+              max_delay: float = MAX_POLL_DELAY) -> concurrent.futures.Future:
+        """Start (or join) watching `file_obj`; the future resolves to the ACTIVE file."""
+        fid = _file_id(file_obj)
+        if not fid:
+            print("Warning: couldn't find file identifier. Inspecting file_obj:", file_obj)
+            future = concurrent.futures.Future()
+            if _is_active(_normalize_state(file_obj)):
+                future.set_result(file_obj)
+            else:
+                future.set_exception(RuntimeError(f"Cannot poll file without an identifier: {file_obj!r}"))
+            return future
+
+        loop = self._ensure_loop()
+        with self._lock:
+            future = self._pending.get(fid)
+            if future is None:
+                future = asyncio.run_coroutine_threadsafe(
+                    self._watch(fid, file_obj, size_bytes, timeout, max_delay), loop
+                )
+                self._pending[fid] = future
+                future.add_done_callback(lambda _f, fid=fid: self._forget(fid))
+        return future
+
+    def _forget(self, fid: str):
+        with self._lock:
+            self._pending.pop(fid, None)
+
+    async def _watch(self, fid: str, file_obj: Any, size_bytes: Optional[int], timeout: float, max_delay: float):
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        delay = initial_poll_delay(size_bytes)
+        last_state = None
+
+        # The upload response often already reports ACTIVE for small files
+        file_status = file_obj
+        while True:
+            norm = _normalize_state(file_status)
+            if norm != last_state:
+                print(f"File {fid} state: {norm}")
+                last_state = norm
+            if _is_active(norm):
+                return file_status
+            if norm in FAILED_STATES:
+                error = getattr(file_status, "error", None)
+                raise FileProcessingFailed(f"File {fid} failed processing: {error or norm}")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError(f"Timed out waiting for file to become ACTIVE. Last observed state: {last_state}")
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * BACKOFF_FACTOR, max_delay)
+
+            try:
+                file_status = await loop.run_in_executor(None, gemini_client.get_file, fid)
+            except Exception as e:
+                print(f"Error while checking state of {fid}: {e}")
+
+
+file_poller = FilePoller()
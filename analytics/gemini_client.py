@@ -0,0 +1,216 @@
+# analytics/gemini_client.py
+"""Process-wide Gemini client with rate limiting.
+
+Every model and Files API call goes through the one `google.genai.Client`
+built here, so the API key is configured once and HTTP connections are reused
+across tabs. Model calls additionally pass a RateLimiter: token buckets for
+requests-per-minute and tokens-per-minute plus a cap on calls in flight.
+Callers that can't go yet wait in FIFO order instead of sending a request that
+would come back as a 429. Retries and circuit breaking are in resilience.py.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from google import genai
+
+from config import client_config, standin_config
+from . import resilience
+
+# --- Configuration ---
+# Gemini bills roughly 258 tokens per sampled frame (1 fps) plus audio and
+# timestamps; used to size the TPM reservation before the real count is known.
+VIDEO_TOKENS_PER_SECOND = 300
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(prompt: str, video_seconds: Optional[float] = None,
+                    max_output_tokens: Optional[int] = None) -> int:
+    """Rough input + output token count of one call, for the TPM bucket."""
+    tokens = len(prompt) // CHARS_PER_TOKEN + int((video_seconds or 0) * VIDEO_TOKENS_PER_SECOND)
+    return tokens + (max_output_tokens or 0)
+
+
+# --- Rate limiting ---
+class TokenBucket:
+    """Classic token bucket refilled continuously at `capacity` per `period` seconds."""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 if it can be taken now)."""
+        self._refill()
+        # a single request bigger than the bucket only has to wait for a full one
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def adjust(self, amount: float):
+        """Credit (positive) or debit (negative) tokens once the real usage is known."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """RPM/TPM buckets plus an in-flight cap, granted to waiters strictly in arrival order."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._in_flight = 0
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens: int = 0):
+        ticket = object()
+        with self._cond:
+            self._queue.append(ticket)
+            try:
+                while True:
+                    if self._queue[0] is ticket and self._in_flight < self.max_in_flight:
+                        wait = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+                        if wait <= 0:
+                            self._requests.take(1)
+                            self._tokens.take(tokens)
+                            self._in_flight += 1
+                            return
+                        self._cond.wait(timeout=wait)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+
+    def release(self, reserved: int = 0, used: Optional[int] = None):
+        with self._cond:
+            self._in_flight -= 1
+            if used is not None:
+                self._tokens.adjust(reserved - used)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tokens: int = 0) -> Iterator[Dict[str, Any]]:
+        """Hold one request slot; set `usage["total_tokens"]` inside to settle the TPM bucket."""
+        self.acquire(tokens)
+        usage: Dict[str, Any] = {"total_tokens": None}
+        try:
+            yield usage
+        finally:
+            self.release(tokens, usage["total_tokens"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"in_flight": self._in_flight, "waiting": len(self._queue)}
+
+
+limiter = RateLimiter(
+    client_config["requests_per_minute"],
+    client_config["tokens_per_minute"],
+    client_config["max_in_flight"],
+)
+
+
+# --- Shared client ---
+_client: Optional[genai.Client] = None
+_client_lock = threading.Lock()
+
+
+def backend_name() -> str:
+    return os.environ.get("GEMINI_BACKEND") or client_config.get("backend", "gemini")
+
+
+def get_client() -> genai.Client:
+    """The process-wide client, created on first use (the offline stand-in if selected)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            if backend_name() == "standin":
+                from .standin import StandInClient
+                _client = StandInClient(standin_config)
+            else:
+                # imported here so the module loads without credentials (e.g. for tooling)
+                from secret import GEMINI_API_KEY
+                _client = genai.Client(api_key=GEMINI_API_KEY)
+        return _client
+
+
+def _total_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) if usage is not None else None
+
+
+def _generate_once(model: str, contents, config: Dict[str, Any], estimated_tokens: int):
+    with limiter.slot(estimated_tokens) as usage:
+        response = get_client().models.generate_content(model=model, contents=contents, config=config)
+        usage["total_tokens"] = _total_tokens(response)
+        return response
+
+
+def _stream_once(model: str, contents, config: Dict[str, Any], estimated_tokens: int) -> Iterator[Any]:
+    # the slot is held until the stream ends
+    with limiter.slot(estimated_tokens) as usage:
+        for chunk in get_client().models.generate_content_stream(model=model, contents=contents, config=config):
+            # usage_metadata is cumulative, the last chunk carries the totals
+            usage["total_tokens"] = _total_tokens(chunk) or usage["total_tokens"]
+            yield chunk
+
+
+def generate_content(model: str, contents, config: Dict[str, Any], estimated_tokens: int = 0):
+    """Rate-limited, retried (and optionally hedged) `models.generate_content`."""
+    return resilience.hedged_call("generate", _generate_once, model, contents, config, estimated_tokens)
+
+
+def generate_content_stream(model: str, contents, config: Dict[str, Any], estimated_tokens: int = 0) -> Iterator[Any]:
+    """Rate-limited `models.generate_content_stream`, retried until the first chunk arrives."""
+    return resilience.call_stream("generate", lambda: _stream_once(model, contents, config, estimated_tokens))
+
+
+def upload_file(path: str, mime_type: Optional[str] = None):
+    return resilience.call(
+        "upload", get_client().files.upload, file=path, config={"mime_type": mime_type} if mime_type else None
+    )
+
+
+def get_file(name: str):
+    return resilience.call("get_file", get_client().files.get, name=name)
+
+
+def create_cache(model: str, contents, system_instruction: str, ttl: str):
+    return resilience.call(
+        "caches", get_client().caches.create, model=model,
+        config={"contents": contents, "system_instruction": system_instruction, "ttl": ttl},
+    )
+
+
+def update_cache(name: str, ttl: str):
+    return resilience.call("caches", get_client().caches.update, name=name, config={"ttl": ttl})
+
+
+def delete_cache(name: str):
+    return resilience.call("caches", get_client().caches.delete, name=name)
+
+
+def list_files():
+    return resilience.call("list_files", lambda: list(get_client().files.list(config={"page_size": 100})))
+
+
+def delete_file(name: str):
+    return resilience.call("delete_file", get_client().files.delete, name=name)
@@ -0,0 +1,394 @@
+# analytics/gemini_files.py
+"""Shared, content-addressed upload layer for the Gemini Files API.
+
+Every analytics tab asks this module for an ACTIVE handle instead of uploading
+the video itself. Videos are identified by the SHA-256 of their bytes, and the
+hash -> remote file mapping is persisted so that re-opening the app (or a
+second tab on the same clip) reuses the existing upload.
+
+A file is registered as soon as its upload finishes, before it is ACTIVE, so
+a retry after a processing timeout resumes polling that upload instead of
+sending the bytes again. Each record keeps the file's create time, expiry,
+size, content hash and last use; upload_lifecycle.py uses them to delete
+uploads nothing refers to any more.
+
+Clips small enough to travel inside the request skip all of this:
+get_video_part returns them as inline bytes and only uploads larger ones.
+"""
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from google.genai import errors, types
+
+from config import inline_video_config
+from . import gemini_client
+from .file_poller import FileProcessingFailed, _is_active, _normalize_state, file_poller
+from .metrics import metrics
+
+# --- Configuration ---
+# ANALYTICS_DATA_DIR moves all local state (registry, response cache, preprocessed videos), e.g. for benchmarks
+DATA_DIR = os.environ.get("ANALYTICS_DATA_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+# stand-in uploads don't exist on the real API, so they are tracked separately
+UPLOAD_REGISTRY_PATH = os.path.join(
+    DATA_DIR, "gemini_uploads.json" if gemini_client.backend_name() == "gemini" else "standin_uploads.json"
+)
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+# The Files API keeps uploads for 48 hours; stop handing a file out a little
+# before it actually expires so a long generate call doesn't race the deletion.
+DEFAULT_FILE_TTL = timedelta(hours=48)
+EXPIRY_MARGIN = timedelta(minutes=10)
+# last_used_at is persisted at most this often per file
+TOUCH_INTERVAL = timedelta(minutes=1)
+# Rough upper bound on how long one model call takes per second of video it watches
+CALL_SECONDS_PER_VIDEO_SECOND = 1.0
+
+
+def wait_for_file_active(file_obj, gemini_api_key=None, timeout=60, size_bytes=None):
+    """
+    Block until file is ACTIVE and return the final file_status object.
+    Polling is done by the shared FilePoller; raises RuntimeError on FAILED or timeout.
+    """
+    if size_bytes is None:
+        size_bytes = getattr(file_obj, "size_bytes", None)
+    with metrics.timed("poll"):
+        return file_poller.watch(file_obj, size_bytes=size_bytes, timeout=timeout).result()
+
+
+def upload_to_gemini(path, mime_type=None):
+    """Uploads the given file to Gemini.
+
+    See https://ai.google.dev/gemini-api/docs/prompting_with_media
+    """
+    with metrics.timed("upload"):
+        file = gemini_client.upload_file(path, mime_type=mime_type)
+    metrics.inc("uploaded_bytes_total", os.path.getsize(path))
+    print(f"Uploaded file '{file.display_name or os.path.basename(path)}' as: {file.uri}")
+    return file
+
+
+# --- Content hashing ---
+_hash_cache: Dict[tuple, str] = {}
+_hash_cache_lock = threading.Lock()
+
+
+def hash_file(path: str) -> str:
+    """Streaming SHA-256 of a file, memoized on (path, size, mtime)."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _hash_cache_lock:
+        if key in _hash_cache:
+            return _hash_cache[key]
+
+    digest = hashlib.sha256()
+    with metrics.timed("hash"), open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    hexdigest = digest.hexdigest()
+
+    with _hash_cache_lock:
+        _hash_cache[key] = hexdigest
+    return hexdigest
+
+
+# --- Upload registry ---
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock shared with other processes, held on the (otherwise unused) file `path`."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            # released when the file is closed
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            yield
+            return
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class UploadRegistry:
+    """Persistent map of content hash -> uploaded Gemini file record.
+
+    The app and batch_run.py share the file, so every change re-reads it and
+    writes it back under an inter-process lock, and reads pick up the other
+    process's changes whenever the file has changed on disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock_path = f"{path}.lock"
+        self._lock = threading.Lock()
+        self._stamp: Optional[tuple] = None
+        self._records: Dict[str, Dict[str, Any]] = self._load()
+
+    def _file_stamp(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        self._stamp = self._file_stamp()
+        if self._stamp is None:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: could not read upload registry {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._records, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._stamp = self._file_stamp()
+
+    def _refresh(self):
+        """Re-read the file if another process wrote it since (caller holds self._lock)."""
+        if self._file_stamp() != self._stamp:
+            self._records = self._load()
+
+    def _update(self, change: Callable[[Dict[str, Dict[str, Any]]], bool]):
+        """Apply `change` to the records as currently on disk and save them if it returns True."""
+        with self._lock, _file_lock(self._lock_path):
+            self._records = self._load()
+            if change(self._records):
+                self._save()
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            record = self._records.get(digest)
+            return dict(record) if record else None
+
+    def put(self, digest: str, record: Dict[str, Any]):
+        def change(records):
+            records[digest] = record
+            return True
+        self._update(change)
+
+    def remove(self, digest: str):
+        self.remove_if(digest)
+
+    def remove_if(self, digest: str, is_stale: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Optional[Dict[str, Any]]:
+        """Remove the record (if `is_stale(record)` holds on its latest version); returns it if removed."""
+        removed = []
+
+        def change(records):
+            record = records.get(digest)
+            if record is None or (is_stale is not None and not is_stale(record)):
+                return False
+            removed.append(records.pop(digest))
+            return True
+        self._update(change)
+        return removed[0] if removed else None
+
+    def records(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return {digest: dict(record) for digest, record in self._records.items()}
+
+    def touch(self, digest: str):
+        """Record a use of the upload (for idle garbage collection)."""
+        def due(record) -> bool:
+            last_used = _parse_time(record.get("last_used_at"))
+            return last_used is None or datetime.now(timezone.utc) - last_used >= TOUCH_INTERVAL
+
+        record = self.get(digest)
+        if record is None or not due(record):
+            return
+
+        def change(records):
+            record = records.get(digest)
+            if record is None or not due(record):
+                return False
+            record["last_used_at"] = datetime.now(timezone.utc).isoformat()
+            return True
+        self._update(change)
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _expiration_of(file_obj) -> datetime:
+    expiration = _parse_time(getattr(file_obj, "expiration_time", None))
+    return expiration or datetime.now(timezone.utc) + DEFAULT_FILE_TTL
+
+
+def _is_expired(record: Dict[str, Any], margin: timedelta = EXPIRY_MARGIN) -> bool:
+    """True if the upload expires within `margin` (or its expiry is unknown)."""
+    expiration = _parse_time(record.get("expiration_time"))
+    return expiration is None or datetime.now(timezone.utc) >= expiration - margin
+
+
+registry = UploadRegistry(UPLOAD_REGISTRY_PATH)
+
+# ACTIVE handles already seen by this process, so tabs don't even need a get_file
+_active_handles: Dict[str, Any] = {}
+_digest_locks: Dict[str, threading.Lock] = {}
+_digest_locks_guard = threading.Lock()
+
+
+def _lock_for(digest: str) -> threading.Lock:
+    with _digest_locks_guard:
+        return _digest_locks.setdefault(digest, threading.Lock())
+
+
+def _reuse_registered(digest: str, timeout: float, valid_for: timedelta):
+    """Return the ACTIVE handle of a previous upload, or None if it can't be reused."""
+    record = registry.get(digest)
+    if not record:
+        return None
+    if _is_expired(record, valid_for):
+        # re-uploaded now rather than expiring mid-job; the old copy becomes an orphan for GC
+        print(f"Upload {record['name']} expires at {record.get('expiration_time')}; uploading again")
+        registry.remove(digest)
+        return None
+    try:
+        file_status = gemini_client.get_file(record["name"])
+    except errors.ClientError as e:
+        # only "gone" (404) or "not ours" (403) invalidate the upload; a 429 that outlasted the
+        # retries, and server or network errors, propagate rather than trigger a full re-upload
+        if e.code not in (403, 404):
+            raise
+        print(f"Registered upload {record['name']} is no longer available: {e}")
+        registry.remove(digest)
+        return None
+    if _is_active(_normalize_state(file_status)):
+        return file_status
+    # Still PROCESSING from an earlier upload: wait for it rather than re-uploading
+    try:
+        return wait_for_file_active(file_status, timeout=timeout)
+    except FileProcessingFailed as e:
+        print(f"{e}; uploading again")
+        registry.remove(digest)
+        return None
+
+
+def _record_for(file_obj, digest: str, video_path: str, mime_type: str) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc).isoformat()
+    create_time = _parse_time(getattr(file_obj, "create_time", None))
+    return {
+        "name": file_obj.name,
+        "uri": file_obj.uri,
+        "display_name": getattr(file_obj, "display_name", None) or os.path.basename(video_path),
+        "mime_type": mime_type,
+        "sha256": digest,
+        "source_path": os.path.abspath(video_path),
+        "size_bytes": os.path.getsize(video_path),
+        "uploaded_at": now,
+        "create_time": create_time.isoformat() if create_time else now,
+        "expiration_time": _expiration_of(file_obj).isoformat(),
+        "last_used_at": now,
+    }
+
+
+def valid_for_job(video_seconds: float, sequential_calls: int = 1, at_least: float = 0.0) -> timedelta:
+    """`valid_for` of a job making `sequential_calls` model calls, one after another, on a
+    clip of `video_seconds` (and needing the file for at least `at_least` seconds)."""
+    needed = max(sequential_calls * CALL_SECONDS_PER_VIDEO_SECOND * video_seconds, at_least)
+    return EXPIRY_MARGIN + timedelta(seconds=needed)
+
+
+def get_active_file(video_path: str, mime_type: str = "video/mp4", timeout: float = 90,
+                    valid_for: timedelta = EXPIRY_MARGIN):
+    """Return an ACTIVE Gemini file for `video_path`, uploading only if needed.
+
+    Concurrent callers for the same content share one upload. An upload that
+    expires within `valid_for` is replaced up front, so a job that knows how
+    long it needs the file never sees it expire halfway. Raises RuntimeError
+    if the upload never becomes ACTIVE; calling again after a timeout keeps
+    waiting on the same upload.
+    """
+    digest = hash_file(video_path)
+    with _lock_for(digest):
+        handle = _active_handles.get(digest)
+        if handle is not None:
+            # another process sharing the registry may have retired (and deleted) the upload
+            record = registry.get(digest)
+            if record is None or record["name"] != handle.name:
+                _active_handles.pop(digest, None)
+            elif datetime.now(timezone.utc) < _expiration_of(handle) - valid_for:
+                registry.touch(digest)
+                return handle
+
+        active_file = _reuse_registered(digest, timeout, valid_for)
+        if active_file is None:
+            video_file = upload_to_gemini(video_path, mime_type=mime_type)
+            registry.put(digest, _record_for(video_file, digest, video_path, mime_type))
+            try:
+                active_file = wait_for_file_active(video_file, timeout=timeout, size_bytes=os.path.getsize(video_path))
+            except FileProcessingFailed:
+                registry.remove(digest)
+                raise
+        else:
+            print(f"Reusing uploaded file {active_file.name} for {os.path.basename(video_path)}")
+            registry.touch(digest)
+
+        _active_handles[digest] = active_file
+        return active_file
+
+
+def retire_upload(digest: str, is_stale) -> Optional[Dict[str, Any]]:
+    """Unregister an upload if `is_stale(record)` still holds under its lock; returns the record."""
+    with _lock_for(digest):
+        # checked on the record as on disk, so a use recorded by another process keeps the upload
+        record = registry.remove_if(digest, is_stale)
+        if record is None:
+            return None
+        _active_handles.pop(digest, None)
+        return record
+
+
+def get_video_part(video_path: str, mime_type: str = "video/mp4", timeout: float = 90,
+                   valid_for: timedelta = EXPIRY_MARGIN):
+    """Return what to send the model for `video_path`: inline bytes if small, else an ACTIVE file.
+
+    Clips up to inline_video_config["max_bytes"] go inside the request as a
+    Part, which saves the upload and the PROCESSING -> ACTIVE wait; anything
+    larger goes through get_active_file. Either result can be placed in
+    generate contents or a context cache.
+    """
+    size = os.path.getsize(video_path)
+    if inline_video_config["enabled"] and size <= inline_video_config["max_bytes"]:
+        with metrics.timed("inline_read"), open(video_path, "rb") as f:
+            part = types.Part.from_bytes(data=f.read(), mime_type=mime_type)
+        metrics.inc("video_parts_total", mode="inline")
+        metrics.inc("inline_bytes_total", size)
+        return part
+    metrics.inc("video_parts_total", mode="files_api")
+    return get_active_file(video_path, mime_type=mime_type, timeout=timeout, valid_for=valid_for)
+
+
+def describe_video_part(video) -> str:
+    """Short name of a get_video_part result for log messages."""
+    inline = getattr(video, "inline_data", None)
+    if inline is not None:
+        return f"inline clip ({len(inline.data) / (1024 * 1024):.1f} MB)"
+    return video.name
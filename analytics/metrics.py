@@ -0,0 +1,265 @@
+# analytics/metrics.py
+"""Stage timings, token usage and cache counters, served on a local endpoint.
+
+Each stage of the pipeline (hash, preprocess, upload, poll, generate, parse)
+records its duration in a histogram labelled by stage and analytic, and every
+model call adds its `usage_metadata` token counts. `serve()` exposes the lot
+in the Prometheus text format on /metrics and as JSON on /metrics.json;
+`dump_json()` writes the JSON form to a file.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# --- Configuration ---
+METRIC_PREFIX = "analytics"
+# Seconds; covers cache lookups through multi-minute long-video generations
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+# usage_metadata field -> token kind label
+USAGE_FIELDS = {
+    "prompt_token_count": "prompt",
+    "candidates_token_count": "output",
+    "thoughts_token_count": "thoughts",
+    "cached_content_token_count": "cached",
+    "total_token_count": "total",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile estimated by linear interpolation inside the bucket it falls in."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / bucket_count)
+            seen += bucket_count
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max,
+        }
+
+
+class Metrics:
+    """Thread-safe histograms and counters, plus gauges collected at read time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, Dict[str, Any], float]]]] = []
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = _labels(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + amount
+
+    @contextmanager
+    def timed(self, stage: str, **labels) -> Iterator[None]:
+        """Record the duration of the block as `stage_duration_seconds{stage=...}`; errors are counted too."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc("stage_errors_total", stage=stage, **labels)
+            raise
+        finally:
+            self.observe("stage_duration_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+    def record_usage(self, usage_metadata, **labels):
+        """Add the token counts of one response's usage_metadata."""
+        if usage_metadata is None:
+            return
+        for field, kind in USAGE_FIELDS.items():
+            value = getattr(usage_metadata, field, None)
+            if value:
+                self.inc("gemini_tokens_total", value, kind=kind, **labels)
+        self.inc("gemini_calls_total", **labels)
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, Dict[str, Any], float]]]):
+        """Register a function returning (name, labels, value) gauges, called on every read."""
+        self._collectors.append(collector)
+
+    def _gauges(self) -> List[Tuple[str, Labels, float]]:
+        gauges = []
+        for collector in self._collectors:
+            try:
+                gauges.extend((name, _labels(labels), value) for name, labels, value in collector())
+            except Exception as e:
+                print(f"Metrics collector {collector.__name__} failed: {e}")
+        return gauges
+
+    # --- Exposition ---
+    def render_prometheus(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                full = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# TYPE {full} histogram")
+                for labels, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                        cumulative += bucket_count
+                        lines.append(f"{full}_bucket{_format_labels(labels, ('le', str(bound)))} {cumulative}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {hist.sum}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {hist.count}")
+            for name, series in sorted(self._counters.items()):
+                full = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# TYPE {full} counter")
+                lines.extend(f"{full}{_format_labels(labels)} {value}" for labels, value in sorted(series.items()))
+        typed = set()
+        for name, labels, value in self._gauges():
+            full = f"{METRIC_PREFIX}_{name}"
+            if full not in typed:
+                lines.append(f"# TYPE {full} gauge")
+                typed.add(full)
+            lines.append(f"{full}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict[str, Any]:
+        def series_list(series, value_of):
+            return [{"labels": dict(labels), **value_of(value)} for labels, value in sorted(series.items())]
+
+        with self._lock:
+            data = {
+                "histograms": {name: series_list(series, Histogram.to_dict) for name, series in self._histograms.items()},
+                "counters": {name: series_list(series, lambda v: {"value": v}) for name, series in self._counters.items()},
+            }
+        gauges: Dict[str, list] = {}
+        for name, labels, value in self._gauges():
+            gauges.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        data["gauges"] = gauges
+        data["generated_at"] = time.time()
+        return data
+
+    def dump_json(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+metrics = Metrics()
+
+
+# --- Default gauges ---
+def _pipeline_gauges() -> List[Tuple[str, Dict[str, Any], float]]:
+    # imported lazily: these modules record into `metrics` themselves
+    from .gemini_client import limiter
+    from .resilience import _breakers
+    from .response_cache import response_cache
+
+    cache = response_cache.stats()
+    gauges = [
+        ("response_cache_hits", {}, cache["hits"]),
+        ("response_cache_misses", {}, cache["misses"]),
+        ("response_cache_hit_ratio", {}, round(cache["hit_rate"], 4)),
+        ("response_cache_entries", {}, cache["entries"]),
+        ("response_cache_bytes", {}, cache["bytes"]),
+    ]
+    gauges.extend((f"gemini_limiter_{key}", {}, value) for key, value in limiter.stats().items())
+    gauges.extend(
+        ("gemini_circuit_open", {"operation": name}, int(breaker.state != "closed"))
+        for name, breaker in list(_breakers.items())
+    )
+    return gauges
+
+
+metrics.add_collector(_pipeline_gauges)
+
+
+# --- HTTP endpoint ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, content_type = metrics.render_prometheus(), "text/plain; version=0.0.4"
+        elif path == "/metrics.json":
+            body, content_type = json.dumps(metrics.to_dict(), indent=2), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        # scrapes every few seconds would drown the console
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def serve(host: str = "127.0.0.1", port: int = 9464) -> ThreadingHTTPServer:
+    """Start the metrics endpoint on a daemon thread (once per process)."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+            print(f"Metrics on http://{host}:{port}/metrics (JSON: /metrics.json)")
+        return _server
@@ -0,0 +1,84 @@
+# analytics/motion_gate.py
+"""Motion gating: find the spans of a recording where something happens.
+
+Overnight and idle-period CCTV footage is mostly static. A cheap frame
+differencing pass over a small grayscale copy of the video finds low-activity
+stretches; preprocess.prepare_video then encodes only the active spans into a
+condensed clip whose TimestampMap maps model timestamps back to original time.
+"""
+from typing import List, Tuple
+
+import cv2
+
+# --- Configuration ---
+ANALYSIS_WIDTH = 160  # frames are shrunk to this width before differencing
+SAMPLE_FPS = 1.0
+PIXEL_DIFF_THRESHOLD = 25  # grayscale delta for a pixel to count as changed
+MIN_CHANGED_FRACTION = 0.002  # fraction of changed pixels for a sample to count as active
+PADDING_SECONDS = 5.0  # context kept on each side of an active span
+MIN_GAP_SECONDS = 20.0  # quieter gaps shorter than this are kept rather than cut
+
+
+def video_duration(video_path: str) -> float:
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        return cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps
+    finally:
+        cap.release()
+
+
+def _merge_spans(spans: List[Tuple[float, float]], min_gap: float) -> List[Tuple[float, float]]:
+    merged: List[Tuple[float, float]] = []
+    for start, end in sorted(spans):
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def find_active_spans(video_path: str, sample_fps: float = SAMPLE_FPS,
+                      padding: float = PADDING_SECONDS, min_gap: float = MIN_GAP_SECONDS) -> List[Tuple[float, float]]:
+    """Return sorted, non-overlapping (start, end) spans of activity in seconds.
+
+    If nothing moves at all, the first few seconds are returned so the model
+    still sees the scene.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video {video_path}")
+
+    spans: List[Tuple[float, float]] = []
+    duration = 0.0
+    try:
+        src_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        step = 1.0 / sample_fps
+        previous = None
+        next_sample = 0.0
+        frame_index = 0
+        while cap.grab():
+            t = frame_index / src_fps
+            frame_index += 1
+            duration = t
+            if t + 1e-6 < next_sample:
+                continue
+            next_sample = (int(t / step + 1e-6) + 1) * step
+            ok, frame = cap.retrieve()
+            if not ok:
+                break
+
+            h, w = frame.shape[:2]
+            small = cv2.resize(frame, (ANALYSIS_WIDTH, max(1, h * ANALYSIS_WIDTH // w)), interpolation=cv2.INTER_AREA)
+            gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+            if previous is not None:
+                changed = cv2.countNonZero(cv2.threshold(cv2.absdiff(gray, previous), PIXEL_DIFF_THRESHOLD, 255, cv2.THRESH_BINARY)[1])
+                if changed / gray.size >= MIN_CHANGED_FRACTION:
+                    spans.append((max(0.0, t - step - padding), t + padding))
+            previous = gray
+    finally:
+        cap.release()
+
+    if not spans:
+        return [(0.0, min(duration, 2 * padding) or step)]
+    return [(start, min(end, duration + 1e-3)) for start, end in _merge_spans(spans, min_gap)]
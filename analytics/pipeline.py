@@ -0,0 +1,227 @@
+# analytics/pipeline.py
+"""Upload (or inline) -> wait for ACTIVE -> generate flow shared by every Gemini analytics tab."""
+import time
+from functools import partial
+from typing import Any, Dict, Iterator, Optional
+
+from google.genai import errors
+
+from config import config
+from . import gemini_client
+from .chunking import WINDOW_SECONDS, analyze_chunked, is_long_video
+from .combined import COMBINED_PREAMBLE
+from .context_cache import strip_preamble
+from .gemini_files import get_video_part, hash_file, valid_for_job
+from .metrics import metrics
+from .motion_gate import video_duration
+from .preprocess import PreprocessedVideo, prepare_video
+from .prompts import ANALYTIC_PROMPTS
+from .resilience import CircuitOpenError
+from .response_cache import response_cache
+from .sampling import apply_to_config, billed_video_seconds, profile_for, video_part, without_offsets
+from .structured import tidy_json_text
+
+# --- Configuration ---
+MODEL_NAME = "gemini-2.5-flash"
+UPLOAD_TIMEOUT = 90
+
+_ANALYTIC_BY_PROMPT = {prompt: name for name, prompt in ANALYTIC_PROMPTS.items()}
+
+
+def analytic_label(prompt: str) -> str:
+    """Metrics label for a prompt: the analytic's name, "combined" or "custom"."""
+    if prompt in _ANALYTIC_BY_PROMPT:
+        return _ANALYTIC_BY_PROMPT[prompt]
+    return "combined" if prompt.startswith(COMBINED_PREAMBLE) else "custom"
+
+
+def generation_config_for(schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The shared generation config, constrained to `schema` when one is given."""
+    if schema is None:
+        return config
+    return {**config, "response_mime_type": "application/json", "response_json_schema": schema}
+
+
+def request_for(active_file, prompt: str, schema: Optional[Dict[str, Any]] = None,
+                cached_content: Optional[str] = None, sampling: Optional[Dict[str, Any]] = None):
+    """(contents, config) of one call; with `cached_content` the video comes from the context cache.
+
+    `sampling` (a profile from sampling.py) is ignored with a cache, whose video can't be re-sampled.
+    """
+    if cached_content:
+        return [strip_preamble(prompt)], {**generation_config_for(schema), "cached_content": cached_content}
+    sampling = sampling or {}
+    return [prompt, video_part(active_file, sampling)], apply_to_config(generation_config_for(schema), sampling)
+
+
+def _estimate(prompt: str, video_seconds: Optional[float], sampling: Optional[Dict[str, Any]]) -> int:
+    return gemini_client.estimate_tokens(
+        prompt, billed_video_seconds(sampling or {}, video_seconds), config.get("max_output_tokens")
+    )
+
+
+def generate_for_file(active_file, prompt: str, schema: Optional[Dict[str, Any]] = None,
+                      video_seconds: Optional[float] = None, cached_content: Optional[str] = None,
+                      sampling: Optional[Dict[str, Any]] = None) -> str:
+    """Run one prompt against a video (ACTIVE file or inline Part) and return the response text.
+
+    `video_seconds` only sizes the tokens-per-minute reservation;
+    `cached_content` names a context cache holding the file (see context_cache.py);
+    `sampling` is the video sampling profile to request (see sampling.py).
+    """
+    analytic = analytic_label(prompt)
+    contents, call_config = request_for(active_file, prompt, schema, cached_content, sampling)
+    with metrics.timed("generate", analytic=analytic):
+        response = gemini_client.generate_content(
+            MODEL_NAME, contents, call_config, estimated_tokens=_estimate(prompt, video_seconds, sampling),
+        )
+    metrics.record_usage(response.usage_metadata, analytic=analytic)
+    return response.text if response.text is not None else str(response)
+
+
+def stream_for_file(active_file, prompt: str, schema: Optional[Dict[str, Any]] = None,
+                    video_seconds: Optional[float] = None, cached_content: Optional[str] = None,
+                    sampling: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """Like generate_for_file, but yields the text accumulated so far as chunks arrive."""
+    analytic = analytic_label(prompt)
+    contents, call_config = request_for(active_file, prompt, schema, cached_content, sampling)
+    text = ""
+    usage = None
+    start = time.perf_counter()
+    with metrics.timed("generate", analytic=analytic):
+        for chunk in gemini_client.generate_content_stream(
+            MODEL_NAME, contents, call_config, estimated_tokens=_estimate(prompt, video_seconds, sampling),
+        ):
+            # usage_metadata is cumulative, the last chunk carries the totals
+            usage = chunk.usage_metadata or usage
+            # chunks without text parts (e.g. the final finish_reason chunk) have text None
+            if not chunk.text:
+                continue
+            if not text:
+                metrics.observe("stage_duration_seconds", time.perf_counter() - start, stage="first_chunk", analytic=analytic)
+            text += chunk.text
+            yield text
+    metrics.record_usage(usage, analytic=analytic)
+
+
+def generate_for_video(prepared: PreprocessedVideo, prompt: str, active_file=None,
+                       schema: Optional[Dict[str, Any]] = None) -> str:
+    """Run one prompt on a prepared video and return JSON text with original-video timestamps.
+
+    Long clips go through the chunked window analysis; otherwise `active_file`
+    (from get_video_part if not given: inline bytes or an upload) is used for
+    a single call. Truncated JSON is repaired locally rather than re-requested.
+    The analytic's sampling profile (see sampling.py) is applied.
+    """
+    sampling = profile_for(analytic_label(prompt))
+    if is_long_video(prepared.path):
+        window_generate = partial(generate_for_file, schema=schema, video_seconds=WINDOW_SECONDS, sampling=without_offsets(sampling))
+        return analyze_chunked(prepared, prompt, window_generate, upload_timeout=UPLOAD_TIMEOUT)
+    seconds = video_duration(prepared.path)
+    if active_file is None:
+        active_file = get_video_part(prepared.path, mime_type="video/mp4", timeout=UPLOAD_TIMEOUT, valid_for=valid_for_job(seconds))
+    text = generate_for_file(active_file, prompt, schema, seconds, sampling=sampling)
+    with metrics.timed("parse", analytic=analytic_label(prompt)):
+        return tidy_json_text(prepared.timestamp_map.remap_text(text))
+
+
+def stream_for_video(prepared: PreprocessedVideo, prompt: str, active_file=None,
+                     schema: Optional[Dict[str, Any]] = None, cached_content: Optional[str] = None) -> Iterator[str]:
+    """Streaming counterpart of generate_for_video; the last value yielded is the full text.
+
+    Partial output is shown as the JSON parsed so far (closed off by the
+    repair step), so sections appear in the UI as soon as they are complete.
+    `cached_content` is a context cache of `active_file` to run the prompt against
+    (the analytic's sampling profile only applies without one).
+    """
+    analytic = analytic_label(prompt)
+    sampling = profile_for(analytic)
+    if is_long_video(prepared.path):
+        # windows are merged only once all of them are back, so there is nothing partial to show
+        yield "Long video: analyzing it in overlapping windows..."
+        window_generate = partial(generate_for_file, schema=schema, video_seconds=WINDOW_SECONDS, sampling=without_offsets(sampling))
+        yield analyze_chunked(prepared, prompt, window_generate, upload_timeout=UPLOAD_TIMEOUT)
+        return
+    seconds = video_duration(prepared.path)
+    if active_file is None:
+        active_file = get_video_part(prepared.path, mime_type="video/mp4", timeout=UPLOAD_TIMEOUT, valid_for=valid_for_job(seconds))
+    # Every chunk is parsed for display, but only the parse of the complete text is recorded as
+    # "parse" (comparable with generate_for_video); the earlier ones go under "partial_parse".
+    last_parse = None
+    for text in stream_for_file(active_file, prompt, schema, seconds, cached_content, sampling):
+        if last_parse is not None:
+            metrics.observe("stage_duration_seconds", last_parse, stage="partial_parse", analytic=analytic)
+        start = time.perf_counter()
+        text = tidy_json_text(prepared.timestamp_map.remap_text(text))
+        last_parse = time.perf_counter() - start
+        yield text
+    if last_parse is not None:
+        metrics.observe("stage_duration_seconds", last_parse, stage="parse", analytic=analytic)
+
+
+def _cache_config(prompt: str) -> Dict[str, Any]:
+    # a changed sampling profile must not return answers given at the old sampling
+    sampling = profile_for(analytic_label(prompt))
+    return {**config, "sampling": sampling} if sampling else config
+
+
+def cached_response(video_hash: str, prompt: str, refresh: bool = False):
+    """Return a previously stored response for this video/prompt/model/config/sampling, if any."""
+    if refresh:
+        return None
+    cached = response_cache.get(video_hash, prompt, MODEL_NAME, _cache_config(prompt))
+    metrics.inc("response_cache_lookups_total", analytic=analytic_label(prompt), result="miss" if cached is None else "hit")
+    return cached
+
+
+def store_response(video_hash: str, prompt: str, text: str):
+    response_cache.put(video_hash, prompt, MODEL_NAME, _cache_config(prompt), text)
+
+
+def analyze_video_stream(video_path: str, prompt: str, refresh: bool = False,
+                         schema: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """Analyze a video with one prompt, yielding progress and then the growing response text.
+
+    `schema` constrains the response to that JSON schema (see structured.py);
+    `refresh=True` bypasses the response cache. Used as a Gradio generator
+    handler, so the first output shows up as soon as the model starts answering.
+    """
+    if not video_path:
+        yield "Please upload a video to analyze."
+        return
+
+    yield "Preparing video..."
+    # downscaled / decimated copy; its timestamp map converts reported times back
+    prepared = prepare_video(video_path)
+    video_hash = hash_file(prepared.path)
+    cached = cached_response(video_hash, prompt, refresh)
+    if cached is not None:
+        yield cached
+        return
+
+    # shared, content-addressed upload (per window for long videos), then the model call
+    yield "Uploading video and waiting for it to be processed..."
+    text = None
+    try:
+        for text in stream_for_video(prepared, prompt, schema=schema):
+            yield text
+    except CircuitOpenError as e:
+        yield f"Gemini is currently unavailable: {e}"
+        return
+    except RuntimeError as e:
+        yield f"Upload processed but never became ACTIVE: {e}"
+        return
+    except errors.APIError as e:
+        yield f"Gemini request failed: {e}"
+        return
+    if text is not None:
+        store_response(video_hash, prompt, text)
+
+
+def analyze_video(video_path: str, prompt: str, refresh: bool = False,
+                  schema: Optional[Dict[str, Any]] = None) -> str:
+    """Blocking variant of analyze_video_stream that returns only the final text."""
+    text = ""
+    for text in analyze_video_stream(video_path, prompt, refresh, schema):
+        pass
+    return text
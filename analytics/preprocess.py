@@ -0,0 +1,258 @@
+# analytics/preprocess.py
+"""Pre-upload video reduction.
+
+CCTV files arrive as 1080p/30 fps with audio, while every prompt only needs
+the visual content at 1-2 fps. Before upload the video is re-encoded with
+OpenCV: optionally cropped to the camera's region of interest, downscaled to
+a maximum resolution and decimated to `target_fps`. Long recordings can also
+be motion-gated so static stretches are cut (see motion_gate.py). OpenCV's
+VideoWriter does not carry audio, so the audio track is dropped as a side
+effect. A timestamp map from reduced-clip time back to original time is kept
+alongside the reduced file, so timestamps reported by the model can be
+converted back.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+
+from config import preprocess_config
+from .gemini_files import DATA_DIR, hash_file
+from .metrics import metrics
+from .motion_gate import find_active_spans, video_duration
+
+# --- Configuration ---
+PREPROCESSED_DIR = os.path.join(DATA_DIR, "preprocessed")
+# Codecs tried in order; avc1 (H.264) is much smaller but not in every OpenCV build
+FOURCC_CANDIDATES = ("avc1", "mp4v")
+
+_output_locks: Dict[str, threading.Lock] = {}
+_output_locks_guard = threading.Lock()
+
+TIMESTAMP_PATTERN = re.compile(r"\b(\d{1,2}):([0-5]\d):([0-5]\d)\b")
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = max(0, int(round(seconds)))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def parse_timestamp(text: str) -> Optional[float]:
+    match = TIMESTAMP_PATTERN.fullmatch(text.strip())
+    if not match:
+        return None
+    hours, minutes, secs = (int(g) for g in match.groups())
+    return float(hours * 3600 + minutes * 60 + secs)
+
+
+# --- Timestamp map ---
+@dataclass
+class TimestampMap:
+    """Piecewise-linear map from reduced-clip time to original video time.
+
+    Each segment is (clip_start, original_start, duration) in seconds. An
+    empty map is the identity.
+    """
+    segments: List[Tuple[float, float, float]] = field(default_factory=list)
+
+    @classmethod
+    def from_frame_times(cls, original_times: Sequence[float], fps: float) -> "TimestampMap":
+        """Build the map for a clip whose i-th frame (shown at i / fps) came from original_times[i]."""
+        frame_step = 1.0 / fps
+        segments: List[Tuple[float, float, float]] = []
+        start = 0
+        for i in range(1, len(original_times) + 1):
+            # A jump of more than 1.5 frame steps in original time starts a new segment
+            if i == len(original_times) or original_times[i] - original_times[i - 1] > 1.5 * frame_step:
+                segments.append((start * frame_step, original_times[start], (i - start) * frame_step))
+                start = i
+        return cls(segments)
+
+    def is_identity(self) -> bool:
+        return all(abs(clip_start - original_start) < 1.0 for clip_start, original_start, _ in self.segments)
+
+    def to_original(self, seconds: float) -> float:
+        if not self.segments:
+            return seconds
+        for clip_start, original_start, duration in self.segments:
+            if seconds < clip_start + duration:
+                return original_start + max(0.0, seconds - clip_start)
+        clip_start, original_start, duration = self.segments[-1]
+        return original_start + (seconds - clip_start)
+
+    def remap_text(self, text: str) -> str:
+        """Rewrite every HH:MM:SS timestamp in `text` to original video time."""
+        if self.is_identity():
+            return text
+        return TIMESTAMP_PATTERN.sub(
+            lambda m: format_timestamp(self.to_original(parse_timestamp(m.group(0)))), text
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"segments": [list(segment) for segment in self.segments]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TimestampMap":
+        return cls([tuple(segment) for segment in data.get("segments", [])])
+
+
+@dataclass
+class PreprocessedVideo:
+    path: str
+    source_path: str
+    timestamp_map: TimestampMap = field(default_factory=TimestampMap)
+
+
+# --- Reduction ---
+def _roi_for(video_path: str, settings: Dict[str, Any]) -> Optional[List[int]]:
+    basename = os.path.basename(video_path)
+    for prefix, roi in (settings.get("camera_rois") or {}).items():
+        if basename.startswith(prefix):
+            return list(roi)
+    return None
+
+
+def _open_writer(path: str, fps: float, size: Tuple[int, int]) -> cv2.VideoWriter:
+    for codec in FOURCC_CANDIDATES:
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, size)
+        if writer.isOpened():
+            return writer
+        writer.release()
+    raise RuntimeError(f"No usable video codec for {path} (tried {', '.join(FOURCC_CANDIDATES)})")
+
+
+def _output_path(video_path: str, settings: Dict[str, Any], roi: Optional[List[int]], tag: str) -> str:
+    settings_key = json.dumps({**settings, "camera_rois": None, "roi": roi, "tag": tag}, sort_keys=True)
+    settings_hash = hashlib.sha256(settings_key.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(PREPROCESSED_DIR, f"{hash_file(video_path)[:32]}_{settings_hash}.mp4")
+
+
+def _load_sidecar(path: str) -> Optional[TimestampMap]:
+    sidecar = f"{path}.json"
+    if not (os.path.exists(path) and os.path.exists(sidecar)):
+        return None
+    try:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            return TimestampMap.from_dict(json.load(f))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _save_sidecar(path: str, timestamp_map: TimestampMap):
+    with open(f"{path}.json", "w", encoding="utf-8") as f:
+        json.dump(timestamp_map.to_dict(), f)
+
+
+def reduce_video(video_path: str, output_path: str, settings: Dict[str, Any],
+                 keep_times: Optional[Sequence[Tuple[float, float]]] = None) -> TimestampMap:
+    """Re-encode `video_path` into `output_path` and return its timestamp map.
+
+    `keep_times` optionally restricts the output to (start, end) spans of
+    original time; everything outside them is skipped.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video {video_path}")
+    try:
+        src_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        src_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        src_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        x, y, w, h = _roi_for(video_path, settings) or (0, 0, src_w, src_h)
+        x, y = max(0, x), max(0, y)
+        w, h = min(w, src_w - x), min(h, src_h - y)
+        scale = min(1.0, settings["max_width"] / w, settings["max_height"] / h)
+        # Even dimensions keep H.264 encoders happy
+        out_size = (max(2, int(w * scale) // 2 * 2), max(2, int(h * scale) // 2 * 2))
+
+        target_fps = min(float(settings["target_fps"]), src_fps)
+        step = 1.0 / target_fps
+        spans = list(keep_times) if keep_times is not None else None
+
+        writer = _open_writer(output_path, target_fps, out_size)
+        original_times: List[float] = []
+        next_sample = 0.0
+        frame_index = 0
+        try:
+            while cap.grab():
+                t = frame_index / src_fps
+                frame_index += 1
+                if t + 1e-6 < next_sample:
+                    continue
+                if spans is not None:
+                    while spans and t >= spans[0][1]:
+                        spans.pop(0)
+                    if not spans:
+                        break
+                    if t < spans[0][0]:
+                        continue
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                frame = frame[y:y + h, x:x + w]
+                if frame.shape[1] != out_size[0] or frame.shape[0] != out_size[1]:
+                    frame = cv2.resize(frame, out_size, interpolation=cv2.INTER_AREA)
+                writer.write(frame)
+                original_times.append(t)
+                # stay on a fixed grid so the kept frames don't drift from i / target_fps
+                next_sample = (int(t / step + 1e-6) + 1) * step
+        finally:
+            writer.release()
+    finally:
+        cap.release()
+
+    if not original_times:
+        raise RuntimeError(f"No frames kept from {video_path}")
+    return TimestampMap.from_frame_times(original_times, target_fps)
+
+
+def prepare_video(video_path: str, settings: Optional[Dict[str, Any]] = None) -> PreprocessedVideo:
+    """Return the reduced version of `video_path`, building it on first use.
+
+    Reduced clips are cached under data/preprocessed/ by source hash and
+    settings. If reduction is disabled or fails, the original file is used.
+    """
+    settings = {**preprocess_config, **(settings or {})}
+    if not settings.get("enabled", True):
+        return PreprocessedVideo(path=video_path, source_path=video_path)
+
+    roi = _roi_for(video_path, settings)
+    output_path = _output_path(video_path, settings, roi, tag="reduce")
+    with _output_locks_guard:
+        lock = _output_locks.setdefault(output_path, threading.Lock())
+    # Tabs analyzing the same video concurrently wait for one reduction
+    with lock:
+        return _build_reduced(video_path, output_path, settings)
+
+
+def _build_reduced(video_path: str, output_path: str, settings: Dict[str, Any]) -> PreprocessedVideo:
+    timestamp_map = _load_sidecar(output_path)
+    if timestamp_map is not None:
+        return PreprocessedVideo(path=output_path, source_path=video_path, timestamp_map=timestamp_map)
+
+    os.makedirs(PREPROCESSED_DIR, exist_ok=True)
+    tmp_path = output_path.replace(".mp4", ".tmp.mp4")
+    try:
+        keep_times = None
+        if settings.get("motion_gate") and video_duration(video_path) >= settings.get("motion_gate_min_duration", 0):
+            with metrics.timed("motion_gate"):
+                keep_times = find_active_spans(video_path)
+            kept = sum(end - start for start, end in keep_times)
+            print(f"Motion gate kept {kept:.0f}s of {video_duration(video_path):.0f}s in {len(keep_times)} spans")
+        with metrics.timed("preprocess"):
+            timestamp_map = reduce_video(video_path, tmp_path, settings, keep_times=keep_times)
+    except Exception as e:
+        print(f"Preprocessing failed for {video_path}, uploading original: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return PreprocessedVideo(path=video_path, source_path=video_path)
+
+    os.replace(tmp_path, output_path)
+    _save_sidecar(output_path, timestamp_map)
+    print(f"Reduced {os.path.basename(video_path)}: {os.path.getsize(video_path)} -> {os.path.getsize(output_path)} bytes")
+    return PreprocessedVideo(path=output_path, source_path=video_path, timestamp_map=timestamp_map)
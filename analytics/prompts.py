@@ -339,3 +339,17 @@ Cooking Step Scopes
   }
 }
 """
+
+# Prompt for each Gemini-backed analytic, keyed by its module name in analytics/
+ANALYTIC_PROMPTS = {
+    "people_behaviour": CUSTOMER_BEHAVIOUR_PROMPT,
+    "staff_behaviour": STAFF_BEHAVIOUR_PROMPT,
+    "hygiene": HYGIENE_PROMPT,
+    "safety": SAFETY_PROMPT,
+    "time_monitering": TIME_MONITORING_PROMPT,
+    "customer_requirements": CUSTOMER_REQUIREMENTS_PROMPT,
+    "following_cooking_steps": FOLLOWING_COOKING_STEPS_PROMPT,
+    "occupancy": OCCUPANCY_PROMPT,
+    "queue_length": QUEUE_LENGTH_PROMPT,
+    "operational_efficiency": OPERATIONAL_EFFICIENCY_PROMPT,
+}
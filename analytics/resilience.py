@@ -0,0 +1,235 @@
+# analytics/resilience.py
+"""Retries, hedging and circuit breaking for Gemini calls.
+
+gemini_client routes every model and Files API call through `call` (or
+`call_stream` for streamed generation). Failures are classified first: rate
+limiting, server errors and network errors are retried with full-jitter
+exponential backoff, anything else (bad request, permission, not found) is
+raised at once. A circuit breaker per operation opens after repeated failures,
+so while the backend is down callers fail fast instead of each sitting through
+its own retry schedule. Optionally, a request still running after the p95
+latency of its operation gets a hedged second copy and the first answer wins.
+
+Retries only repeat the failed call. The upload, ACTIVE and generated stages
+are kept by gemini_files and the response cache, so a retry never starts the
+pipeline over.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+import httpx
+from google.genai import errors
+
+from config import resilience_config
+
+# --- Configuration ---
+# error class -> (base delay, max delay) in seconds; 429s back off the longest
+BACKOFF_BY_CLASS = {
+    "rate_limited": (4.0, 60.0),
+    "server": (1.0, 30.0),
+    "network": (0.5, 15.0),
+}
+LATENCY_WINDOW = 200  # recent latencies kept per operation for the hedge deadline
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the backend while its circuit breaker is open."""
+
+
+def classify(exc: BaseException) -> Optional[str]:
+    """Return the retry class of an exception, or None if it must not be retried."""
+    if isinstance(exc, CircuitOpenError):
+        return None
+    if isinstance(exc, errors.APIError):
+        if exc.code == 429:
+            return "rate_limited"
+        if exc.code == 408 or (exc.code or 0) >= 500:
+            return "server"
+        return None
+    if isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return "network"
+    return None
+
+
+def backoff_delay(error_class: str, attempt: int) -> float:
+    """Full-jitter exponential backoff for the `attempt`-th retry (1-based)."""
+    base, cap = BACKOFF_BY_CLASS[error_class]
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+# --- Circuit breaker ---
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures -> half-open after `reset_seconds`.
+
+    While half-open a single probe call is let through; its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_seconds else "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_seconds - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(
+                    f"Gemini {self.name} calls are failing; not retrying for another {max(remaining, 0):.0f}s"
+                )
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    print(f"Circuit breaker for Gemini {self.name} opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(operation: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if operation not in _breakers:
+            _breakers[operation] = CircuitBreaker(
+                operation, resilience_config["breaker_failure_threshold"], resilience_config["breaker_reset_seconds"]
+            )
+        return _breakers[operation]
+
+
+# --- Latency tracking ---
+_latencies: Dict[str, Deque[float]] = {}
+_latencies_lock = threading.Lock()
+
+
+def record_latency(operation: str, seconds: float):
+    with _latencies_lock:
+        _latencies.setdefault(operation, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+
+def latency_percentile(operation: str, fraction: float = 0.95) -> Optional[float]:
+    """Recent latency percentile of `operation`, or None with too few samples to trust."""
+    with _latencies_lock:
+        samples = sorted(_latencies.get(operation, ()))
+    if len(samples) < resilience_config["hedge_min_samples"]:
+        return None
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+# --- Calls ---
+def _after_failure(breaker: CircuitBreaker, operation: str, exc: Exception, attempt: int):
+    """Decide on a failed attempt: sleep before the next one, or re-raise."""
+    error_class = classify(exc)
+    if error_class is None:
+        # the backend answered, the request itself is wrong: not a reason to open the circuit
+        breaker.record_success()
+        raise exc
+    breaker.record_failure()
+    if attempt >= resilience_config["max_attempts"]:
+        raise exc
+    delay = backoff_delay(error_class, attempt)
+    print(f"Gemini {operation} failed ({error_class}: {exc}); retry {attempt} in {delay:.1f}s")
+    time.sleep(delay)
+
+
+def call(operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run `fn(*args, **kwargs)` under the retry policy and circuit breaker of `operation`."""
+    breaker = breaker_for(operation)
+    attempt = 0
+    while True:
+        breaker.before_call()
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            attempt += 1
+            _after_failure(breaker, operation, e, attempt)
+            continue
+        breaker.record_success()
+        record_latency(operation, time.monotonic() - start)
+        return result
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gemini-hedge")
+
+
+def hedged_call(operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Like `call`, but sends a second request if the first outlives the operation's p95.
+
+    Hedging is off unless `resilience_config["hedge_requests"]` is set; the
+    slower request is left to finish in the background and its answer dropped.
+    """
+    deadline = latency_percentile(operation) if resilience_config["hedge_requests"] else None
+    if deadline is None:
+        return call(operation, fn, *args, **kwargs)
+
+    primary = _hedge_pool.submit(call, operation, fn, *args, **kwargs)
+    done, _ = wait([primary], timeout=deadline)
+    if done:
+        return primary.result()
+    print(f"Gemini {operation} slower than p95 ({deadline:.1f}s); sending a hedged request")
+    pending = {primary, _hedge_pool.submit(call, operation, fn, *args, **kwargs)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+
+def call_stream(operation: str, open_stream: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+    """Retry a streamed call until its first chunk arrives, then relay the stream.
+
+    Once output has been yielded a failure is raised as is, since the caller
+    has already shown part of the answer.
+    """
+    breaker = breaker_for(operation)
+    attempt = 0
+    while True:
+        breaker.before_call()
+        start = time.monotonic()
+        stream = open_stream()
+        try:
+            first = next(stream)
+        except StopIteration:
+            breaker.record_success()
+            return
+        except Exception as e:
+            attempt += 1
+            _after_failure(breaker, operation, e, attempt)
+            continue
+        breaker.record_success()
+        record_latency(f"{operation}.first_chunk", time.monotonic() - start)
+        yield first
+        yield from stream
+        return
@@ -0,0 +1,125 @@
+# analytics/response_cache.py
+"""On-disk cache of model responses.
+
+Entries are keyed by (video content hash, prompt hash, model name, generation
+config), so re-running an analytic on a video that was already analyzed skips
+both the upload and the generate_content call. Stored in SQLite with LRU
+eviction bounded by total size and entry age.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .gemini_client import backend_name
+from .gemini_files import DATA_DIR
+
+# --- Configuration ---
+# stand-in answers must never be served as real ones
+RESPONSE_CACHE_PATH = os.path.join(
+    DATA_DIR, "response_cache.sqlite3" if backend_name() == "gemini" else "standin_response_cache.sqlite3"
+)
+MAX_CACHE_BYTES = 256 * 1024 * 1024
+MAX_ENTRY_AGE_SECONDS = 30 * 24 * 3600
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_key(video_hash: str, prompt: str, model_name: str, generation_config: Dict[str, Any]) -> str:
+    payload = {
+        "video": video_hash,
+        "prompt": _sha256(prompt),
+        "model": model_name,
+        "config": generation_config,
+    }
+    return _sha256(json.dumps(payload, sort_keys=True, default=str))
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_bytes: int = MAX_CACHE_BYTES, max_age: float = MAX_ENTRY_AGE_SECONDS):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                video_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, video_hash: str, prompt: str, model_name: str, generation_config: Dict[str, Any]) -> Optional[str]:
+        key = make_key(video_hash, prompt, model_name, generation_config)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, video_hash: str, prompt: str, model_name: str, generation_config: Dict[str, Any], response: str):
+        key = make_key(video_hash, prompt, model_name, generation_config)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, video_hash, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, video_hash, model_name, response, len(response.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until we are back under the size budget
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_PATH)
@@ -0,0 +1,81 @@
+# analytics/sampling.py
+"""Per-analytic video sampling profiles: frame rate, clip offsets and media resolution.
+
+By default the model watches every video at 1 frame per second and default
+resolution, whatever the analytic asks about. A profile in
+config.sampling_config tells it how closely to look instead: occupancy counts
+change slowly and are fine at a frame every few seconds in low resolution,
+while hygiene needs more frames to catch a brief hand-to-face contact. The
+profile is applied when the request is built, as the video Part's
+VideoMetadata (fps, start/end offset) and the request's media_resolution.
+
+Offsets are seconds into the video actually sent (after preprocessing), and
+only apply to single-call analysis; chunked windows keep fps and resolution.
+Requests against a context cache can't re-sample the cached video, so the
+fan-out sends analytics with a profile uncached.
+"""
+from typing import Any, Dict, Optional
+
+from google.genai import types
+
+from config import sampling_config
+
+# --- Configuration ---
+# Without a profile the model samples 1 frame per second
+DEFAULT_FPS = 1.0
+# Tokens per video frame by media resolution (default and medium/high cost the same for video)
+TOKENS_PER_FRAME = {"low": 66, "medium": 258, "high": 258}
+DEFAULT_TOKENS_PER_FRAME = 258
+PROFILE_KEYS = ("fps", "start_offset", "end_offset", "media_resolution")
+
+
+def profile_for(analytic: str) -> Dict[str, Any]:
+    """The sampling profile of `analytic` (empty if it watches at the model default)."""
+    profile = {key: value for key, value in sampling_config.get(analytic, {}).items() if value is not None}
+    unknown = set(profile) - set(PROFILE_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown sampling settings for {analytic}: {', '.join(sorted(unknown))}")
+    if profile.get("media_resolution") is not None and profile["media_resolution"] not in TOKENS_PER_FRAME:
+        raise ValueError(f"media_resolution of {analytic} must be one of {', '.join(TOKENS_PER_FRAME)}")
+    return profile
+
+
+def without_offsets(profile: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in profile.items() if key not in ("start_offset", "end_offset")}
+
+
+def _offset(seconds: Optional[float]) -> Optional[str]:
+    return None if seconds is None else f"{max(0.0, float(seconds)):g}s"
+
+
+def video_part(video, profile: Dict[str, Any]):
+    """`video` (an uploaded File or inline Part) wrapped with the profile's VideoMetadata."""
+    if not any(key in profile for key in ("fps", "start_offset", "end_offset")):
+        return video
+    metadata = types.VideoMetadata(
+        fps=profile.get("fps"),
+        start_offset=_offset(profile.get("start_offset")),
+        end_offset=_offset(profile.get("end_offset")),
+    )
+    if isinstance(video, types.Part):
+        return video.model_copy(update={"video_metadata": metadata})
+    return types.Part(file_data=types.FileData(file_uri=video.uri, mime_type=video.mime_type), video_metadata=metadata)
+
+
+def apply_to_config(call_config: Dict[str, Any], profile: Dict[str, Any]) -> Dict[str, Any]:
+    """`call_config` with the profile's media_resolution, if it sets one."""
+    resolution = profile.get("media_resolution")
+    if resolution is None:
+        return call_config
+    return {**call_config, "media_resolution": f"MEDIA_RESOLUTION_{resolution.upper()}"}
+
+
+def billed_video_seconds(profile: Dict[str, Any], seconds: Optional[float]) -> Optional[float]:
+    """`seconds` of video expressed as seconds at the default rate, for token estimates."""
+    if seconds is None:
+        return None
+    start = profile.get("start_offset") or 0.0
+    end = profile.get("end_offset")
+    watched = max(0.0, (min(end, seconds) if end is not None else seconds) - start)
+    per_frame = TOKENS_PER_FRAME.get(profile.get("media_resolution"), DEFAULT_TOKENS_PER_FRAME)
+    return watched * profile.get("fps", DEFAULT_FPS) / DEFAULT_FPS * per_frame / DEFAULT_TOKENS_PER_FRAME
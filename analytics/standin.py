@@ -0,0 +1,385 @@
+# analytics/standin.py
+"""Offline stand-in for the Gemini API, for benchmarks and quota-free runs.
+
+StandInClient mimics the parts of `google.genai.Client` the analytics use
+(`files.upload/get/delete/list`, `caches.create/update/delete` and
+`models.generate_content[_stream]`) and returns real `google.genai.types`
+objects, so everything above gemini_client runs unchanged: uploads go through
+PROCESSING before turning ACTIVE, responses carry usage_metadata, and injected
+failures are the SDK's own ServerError and ClientError so the retry and
+circuit-breaker paths are exercised too.
+
+Select it with `client_config["backend"] = "standin"` or the environment
+variable GEMINI_BACKEND=standin; delays and error rates come from
+config.standin_config. The upload registry and response cache then live in
+separate standin_* files under data/, so fake answers never mix with real ones.
+"""
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from google.genai import errors, types
+
+from .context_cache import strip_preamble
+from .motion_gate import video_duration
+from .preprocess import format_timestamp
+from .prompts import ANALYTIC_PROMPTS
+from .structured import ANALYTIC_SCHEMAS
+
+# --- Configuration ---
+FILE_TTL = timedelta(hours=48)
+# Same per-second video cost the real API bills at default media resolution (1 fps)
+VIDEO_TOKENS_PER_SECOND = 258
+# Per-frame cost at low media resolution
+LOW_RES_TOKENS_PER_FRAME = 66
+TIMESTAMP_KEYS = ("timestamp", "timestamps", "start", "end")
+# generate_content rejects requests above this size; inline bytes count as base64
+REQUEST_LIMIT_BYTES = 20 * 1024 * 1024
+
+_ANALYTIC_BY_PROMPT = {prompt: name for name, prompt in ANALYTIC_PROMPTS.items()}
+# prompts sent against a context cache arrive without their role line
+_ANALYTIC_BY_PROMPT.update({strip_preamble(prompt): name for name, prompt in ANALYTIC_PROMPTS.items()})
+
+
+def _api_error(error_cls, code: int, status: str, message: str):
+    return error_cls(code, {"error": {"code": code, "status": status, "message": f"stand-in: {message}"}})
+
+
+def example_from_schema(schema: Dict[str, Any], rng: random.Random, duration: float, key: str = "") -> Any:
+    """A plausible instance of a JSON schema; timestamps fall inside `duration`."""
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: example_from_schema(sub, rng, duration, name) for name, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        items = [example_from_schema(schema.get("items", {}), rng, duration, key) for _ in range(rng.randint(1, 4))]
+        if key in TIMESTAMP_KEYS:
+            items.sort()
+        return items
+    if kind == "integer":
+        return rng.randint(0, 12)
+    if kind == "number":
+        return round(rng.uniform(0, 10), 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    if key in TIMESTAMP_KEYS:
+        return format_timestamp(rng.uniform(0, max(duration, 1.0)))
+    return f"stand-in {key or 'text'} {rng.randint(1, 999)}"
+
+
+class _Files:
+    def __init__(self, backend: "StandInClient"):
+        self._backend = backend
+
+    def upload(self, *, file, config=None) -> types.File:
+        return self._backend.upload(file, config)
+
+    def get(self, *, name: str, config=None) -> types.File:
+        return self._backend.get_file(name)
+
+    def delete(self, *, name: str, config=None):
+        self._backend.delete_file(name)
+        return types.DeleteFileResponse()
+
+    def list(self, *, config=None) -> List[types.File]:
+        return self._backend.list_files()
+
+
+class _Caches:
+    def __init__(self, backend: "StandInClient"):
+        self._backend = backend
+
+    def create(self, *, model: str, config=None) -> types.CachedContent:
+        return self._backend.create_cache(model, config)
+
+    def get(self, *, name: str, config=None) -> types.CachedContent:
+        return self._backend.get_cache(name)
+
+    def update(self, *, name: str, config=None) -> types.CachedContent:
+        return self._backend.update_cache(name, config)
+
+    def delete(self, *, name: str, config=None):
+        self._backend.delete_cache(name)
+        return types.DeleteCachedContentResponse()
+
+
+class _Models:
+    def __init__(self, backend: "StandInClient"):
+        self._backend = backend
+
+    def generate_content(self, *, model: str, contents, config=None) -> types.GenerateContentResponse:
+        return self._backend.generate(model, contents, config)
+
+    def generate_content_stream(self, *, model: str, contents, config=None) -> Iterator[types.GenerateContentResponse]:
+        return self._backend.generate_stream(model, contents, config)
+
+
+class StandInClient:
+    """In-process fake of the Files, cachedContents and generate_content endpoints."""
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self._rng = random.Random(settings.get("seed"))
+        self._lock = threading.Lock()
+        # name -> (File, ready_at, video seconds)
+        self._files: Dict[str, Tuple[types.File, float, float]] = {}
+        # name -> (CachedContent, expires_at, video seconds, cached tokens)
+        self._caches: Dict[str, Tuple[types.CachedContent, float, float, int]] = {}
+        # (size, hash) of inline clips -> video seconds
+        self._inline_seconds: Dict[Tuple[int, int], float] = {}
+        self.files = _Files(self)
+        self.caches = _Caches(self)
+        self.models = _Models(self)
+
+    # --- helpers ---
+    def _random(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def _latency(self) -> float:
+        with self._lock:
+            return self._rng.lognormvariate(0, self.settings["latency_sigma"]) * self.settings["latency_median"]
+
+    def _maybe_fail(self):
+        roll = self._random()
+        if roll < self.settings["rate_limit_rate"]:
+            raise _api_error(errors.ClientError, 429, "RESOURCE_EXHAUSTED", "injected rate limit")
+        if roll < self.settings["rate_limit_rate"] + self.settings["error_rate"]:
+            raise _api_error(errors.ServerError, 503, "UNAVAILABLE", "injected server error")
+
+    def _snapshot(self, name: str) -> types.File:
+        with self._lock:
+            if name not in self._files:
+                raise _api_error(errors.ClientError, 404, "NOT_FOUND", f"file {name} does not exist")
+            file, ready_at, _ = self._files[name]
+        state = types.FileState.ACTIVE if time.monotonic() >= ready_at else types.FileState.PROCESSING
+        return file.model_copy(update={"state": state})
+
+    # --- files ---
+    def upload(self, path, config) -> types.File:
+        config = config or {}
+        mime_type = config.get("mime_type") if isinstance(config, dict) else config.mime_type
+        size = os.path.getsize(path)
+        time.sleep(size / self.settings["upload_bytes_per_second"])
+        self._maybe_fail()
+        try:
+            seconds = video_duration(path)
+        except Exception:
+            seconds = 0.0
+        now = datetime.now(timezone.utc)
+        file_id = uuid.uuid4().hex[:12]
+        file = types.File(
+            name=f"files/{file_id}",
+            uri=f"standin://files/{file_id}",
+            display_name=os.path.basename(path),
+            mime_type=mime_type or "video/mp4",
+            size_bytes=size,
+            create_time=now,
+            expiration_time=now + FILE_TTL,
+            state=types.FileState.PROCESSING,
+        )
+        processing = max(self.settings["min_processing_seconds"], size / self.settings["processing_bytes_per_second"])
+        with self._lock:
+            self._files[file.name] = (file, time.monotonic() + processing, seconds)
+        return file
+
+    def get_file(self, name: str) -> types.File:
+        time.sleep(self.settings["files_api_latency"])
+        self._maybe_fail()
+        return self._snapshot(name)
+
+    def delete_file(self, name: str):
+        time.sleep(self.settings["files_api_latency"])
+        with self._lock:
+            if self._files.pop(name, None) is None:
+                raise _api_error(errors.ClientError, 404, "NOT_FOUND", f"file {name} does not exist")
+
+    def list_files(self) -> List[types.File]:
+        with self._lock:
+            names = list(self._files)
+        return [self._snapshot(name) for name in names]
+
+    def _video_seconds(self, item) -> float:
+        """Seconds of video an item of contents carries (an ACTIVE file or a video Part), after its offsets."""
+        if isinstance(item, types.Part) and item.video_metadata is not None:
+            seconds = self._video_seconds(item.model_copy(update={"video_metadata": None}))
+            metadata = item.video_metadata
+            start = float((metadata.start_offset or "0s").rstrip("s"))
+            end = float(metadata.end_offset.rstrip("s")) if metadata.end_offset else seconds
+            return max(0.0, min(end, seconds) - start)
+        if isinstance(item, types.Part) and item.file_data is not None:
+            # stand-in uris are standin://files/<id> for the file named files/<id>
+            return self._video_seconds({"name": "files/" + item.file_data.file_uri.rsplit("/", 1)[-1]})
+        if isinstance(item, types.Part) and item.inline_data is not None:
+            data = item.inline_data.data
+            if len(data) * 4 / 3 > REQUEST_LIMIT_BYTES:
+                raise _api_error(errors.ClientError, 400, "INVALID_ARGUMENT",
+                                 f"request payload of {len(data)} inline bytes exceeds {REQUEST_LIMIT_BYTES} bytes")
+            # the bytes travel with the request instead of being uploaded beforehand
+            time.sleep(len(data) / self.settings["upload_bytes_per_second"])
+            key = (len(data), hash(data))
+            with self._lock:
+                seconds = self._inline_seconds.get(key)
+            if seconds is None:
+                with tempfile.NamedTemporaryFile(suffix=".mp4") as f:
+                    f.write(data)
+                    f.flush()
+                    try:
+                        seconds = video_duration(f.name)
+                    except Exception:
+                        seconds = 0.0
+                with self._lock:
+                    self._inline_seconds[key] = seconds
+            return seconds
+        name = item.name if isinstance(item, types.File) else item.get("name") if isinstance(item, dict) else None
+        if name is None:
+            return 0.0
+        file = self._snapshot(name)
+        if file.state != types.FileState.ACTIVE:
+            raise _api_error(errors.ClientError, 400, "FAILED_PRECONDITION", f"file {name} is not ACTIVE")
+        with self._lock:
+            return self._files[name][2]
+
+    # --- context caches ---
+    @staticmethod
+    def _config_dict(config) -> Dict[str, Any]:
+        if config is None:
+            return {}
+        return config if isinstance(config, dict) else config.model_dump(exclude_none=True)
+
+    @staticmethod
+    def _ttl_seconds(ttl: Optional[str]) -> float:
+        return float(str(ttl or "3600s").rstrip("s"))
+
+    def create_cache(self, model: str, config) -> types.CachedContent:
+        config = self._config_dict(config)
+        self._maybe_fail()
+        seconds = 0.0
+        for item in config.get("contents") or []:
+            seconds += self._video_seconds(item)
+        tokens = int(seconds * VIDEO_TOKENS_PER_SECOND) + len(str(config.get("system_instruction") or "")) // 4
+        if tokens < self.settings["min_cache_tokens"]:
+            raise _api_error(errors.ClientError, 400, "INVALID_ARGUMENT",
+                             f"cached content has {tokens} tokens, minimum is {self.settings['min_cache_tokens']}")
+        time.sleep(self.settings["cache_create_latency"])
+        ttl = self._ttl_seconds(config.get("ttl"))
+        now = datetime.now(timezone.utc)
+        cache = types.CachedContent(
+            name=f"cachedContents/{uuid.uuid4().hex[:12]}",
+            model=model,
+            create_time=now,
+            update_time=now,
+            expire_time=now + timedelta(seconds=ttl),
+            usage_metadata=types.CachedContentUsageMetadata(total_token_count=tokens),
+        )
+        with self._lock:
+            self._caches[cache.name] = (cache, time.monotonic() + ttl, seconds, tokens)
+        return cache
+
+    def _live_cache(self, name: str) -> Tuple[types.CachedContent, float, float, int]:
+        with self._lock:
+            entry = self._caches.get(name)
+            if entry is None or time.monotonic() >= entry[1]:
+                self._caches.pop(name, None)
+                raise _api_error(errors.ClientError, 404, "NOT_FOUND", f"cached content {name} does not exist")
+            return entry
+
+    def get_cache(self, name: str) -> types.CachedContent:
+        time.sleep(self.settings["files_api_latency"])
+        return self._live_cache(name)[0]
+
+    def update_cache(self, name: str, config) -> types.CachedContent:
+        time.sleep(self.settings["files_api_latency"])
+        cache, _, seconds, tokens = self._live_cache(name)
+        ttl = self._ttl_seconds(self._config_dict(config).get("ttl"))
+        cache = cache.model_copy(update={"expire_time": datetime.now(timezone.utc) + timedelta(seconds=ttl)})
+        with self._lock:
+            self._caches[name] = (cache, time.monotonic() + ttl, seconds, tokens)
+        return cache
+
+    def delete_cache(self, name: str):
+        time.sleep(self.settings["files_api_latency"])
+        self._live_cache(name)
+        with self._lock:
+            self._caches.pop(name, None)
+
+    # --- generation ---
+    def _answer(self, contents, config) -> Tuple[str, int, int]:
+        """Return (response text, prompt tokens, cached tokens) for a request."""
+        config = self._config_dict(config)
+        prompt = ""
+        seconds = 0.0
+        frames = 0.0
+        cached_tokens = 0
+        if config.get("cached_content"):
+            _, _, seconds, cached_tokens = self._live_cache(config["cached_content"])
+        for item in contents if isinstance(contents, list) else [contents]:
+            if isinstance(item, str):
+                prompt += item
+            else:
+                item_seconds = self._video_seconds(item)
+                metadata = item.video_metadata if isinstance(item, types.Part) else None
+                seconds += item_seconds
+                frames += item_seconds * (metadata.fps if metadata is not None and metadata.fps else 1.0)
+        low_res = str(config.get("media_resolution") or "").endswith("LOW")
+        video_tokens = int(frames * (LOW_RES_TOKENS_PER_FRAME if low_res else VIDEO_TOKENS_PER_SECOND))
+
+        analytic = _ANALYTIC_BY_PROMPT.get(prompt)
+        canned_dir = self.settings.get("canned_dir")
+        if analytic and canned_dir and os.path.exists(os.path.join(canned_dir, f"{analytic}.json")):
+            with open(os.path.join(canned_dir, f"{analytic}.json"), "r", encoding="utf-8") as f:
+                text = f.read()
+        else:
+            schema = config.get("response_json_schema") or (ANALYTIC_SCHEMAS.get(analytic) if analytic else None)
+            if schema is None:
+                text = "Stand-in response."
+            else:
+                with self._lock:
+                    data = example_from_schema(schema, self._rng, seconds)
+                text = json.dumps(data, indent=2)
+        if cached_tokens:
+            return text, len(prompt) // 4 + cached_tokens, cached_tokens
+        return text, len(prompt) // 4 + video_tokens, 0
+
+    @staticmethod
+    def _response(text: Optional[str], usage: Optional[types.GenerateContentResponseUsageMetadata] = None,
+                  finished: bool = False) -> types.GenerateContentResponse:
+        candidate = types.Candidate(
+            content=types.Content(role="model", parts=[types.Part(text=text)] if text else []),
+            finish_reason=types.FinishReason.STOP if finished else None,
+        )
+        return types.GenerateContentResponse(candidates=[candidate], usage_metadata=usage)
+
+    @staticmethod
+    def _usage(prompt_tokens: int, cached_tokens: int, text: str) -> types.GenerateContentResponseUsageMetadata:
+        output_tokens = len(text) // 4
+        return types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            cached_content_token_count=cached_tokens or None,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        )
+
+    def generate(self, model: str, contents, config) -> types.GenerateContentResponse:
+        self._maybe_fail()
+        text, prompt_tokens, cached_tokens = self._answer(contents, config)
+        time.sleep(self._latency())
+        return self._response(text, self._usage(prompt_tokens, cached_tokens, text), finished=True)
+
+    def generate_stream(self, model: str, contents, config) -> Iterator[types.GenerateContentResponse]:
+        self._maybe_fail()
+        text, prompt_tokens, cached_tokens = self._answer(contents, config)
+        total = self._latency()
+        chunks = max(1, self.settings["stream_chunks"])
+        size = -(-len(text) // chunks)
+        # the first chunk carries most of the wait, like time-to-first-token does
+        time.sleep(total * self.settings["first_chunk_fraction"])
+        for i in range(0, len(text), size):
+            yield self._response(text[i:i + size])
+            time.sleep(total * (1 - self.settings["first_chunk_fraction"]) / chunks)
+        yield self._response(None, self._usage(prompt_tokens, cached_tokens, text), finished=True)
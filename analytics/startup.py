@@ -0,0 +1,72 @@
+# analytics/startup.py
+"""Startup-time accounting and background warm-up for the app.
+
+`import_module` imports a tab's module and records how long it took;
+`warm_up_in_background` runs slow initialisations (face models, the Gemini
+client) on a daemon thread once the UI is built, so the first click doesn't
+pay for them but the app doesn't wait for them either. Both record into
+analytics.metrics (stage "import" / "warm_up"), and `startup_report()` gives the
+per-module breakdown once the app is up.
+"""
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from .metrics import metrics
+
+_started = time.perf_counter()
+_lock = threading.Lock()
+# (phase, component, seconds, error)
+_timings: List[Tuple[str, str, float, str]] = []
+
+
+@contextmanager
+def timed(phase: str, component: str) -> Iterator[None]:
+    start = time.perf_counter()
+    error = ""
+    try:
+        yield
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe("stage_duration_seconds", elapsed, stage=phase, component=component)
+        with _lock:
+            _timings.append((phase, component, elapsed, error))
+
+
+def import_module(name: str) -> ModuleType:
+    """importlib.import_module, timed under the module's short name."""
+    with timed("import", name.rsplit(".", 1)[-1]):
+        return importlib.import_module(name)
+
+
+def warm_up_in_background(tasks: Dict[str, Callable[[], object]], report: bool = True) -> threading.Thread:
+    """Run each `tasks[name]()` in turn on a daemon thread; failures are reported, not raised."""
+    def run():
+        for name, task in tasks.items():
+            try:
+                with timed("warm_up", name):
+                    task()
+            except Exception as e:
+                print(f"Warm-up of {name} failed (it will be retried on first use): {e}")
+        if report:
+            print(startup_report())
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def startup_report() -> str:
+    """Table of import and warm-up times recorded so far, slowest first."""
+    with _lock:
+        timings = sorted(_timings, key=lambda t: -t[2])
+    lines = [f"Startup times ({time.perf_counter() - _started:.1f}s since start):"]
+    for phase, component, seconds, error in timings:
+        lines.append(f"  {phase:<8} {component:<26} {seconds:7.2f}s{'  ' + error if error else ''}")
+    return "\n".join(lines)
@@ -0,0 +1,200 @@
+# analytics/structured.py
+"""Structured output: per-analytic JSON schemas, a fast parser and local repair.
+
+Each analytic's schema is derived from the example object in the "## Output"
+block of its prompt, so the prompt and the schema sent as `response_json_schema`
+can never drift apart. Responses are parsed with orjson when it is installed,
+and truncated or sloppy JSON is repaired locally instead of paying for another
+video-inference call.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+from .prompts import ANALYTIC_PROMPTS
+
+OUTPUT_MARKER = "## Output (only this JSON)"
+TEXT_FIELDS = ("description", "observation", "step", "task")
+
+
+def _loads(text: str):
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(str(e)) from e
+    return json.loads(text)
+
+
+# --- Schemas ---
+def _example_object(prompt: str) -> Dict[str, Any]:
+    """Parse the example JSON of a prompt, whose placeholders are `int` / `float`."""
+    example = prompt.partition(OUTPUT_MARKER)[2]
+    example = example[example.index("{"):example.rindex("}") + 1]
+    example = re.sub(r":\s*int\b", ": 0", example)
+    example = re.sub(r":\s*float\b", ": 0.5", example)
+    return json.loads(example)
+
+
+def schema_from_example(value: Any) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return {
+            "type": "object",
+            "properties": {key: schema_from_example(item) for key, item in value.items()},
+            "required": list(value),
+        }
+    if isinstance(value, list):
+        return {"type": "array", "items": schema_from_example(value[0]) if value else {"type": "string"}}
+    if isinstance(value, bool):
+        return {"type": "boolean"}
+    if isinstance(value, int):
+        return {"type": "integer"}
+    if isinstance(value, float):
+        return {"type": "number"}
+    return {"type": "string"}
+
+
+ANALYTIC_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    name: schema_from_example(_example_object(prompt)) for name, prompt in ANALYTIC_PROMPTS.items()
+}
+
+
+def schema_for(names: Iterable[str]) -> Dict[str, Any]:
+    """Schema for one analytic, or the merged schema of a combined request."""
+    names = list(names)
+    if len(names) == 1:
+        return ANALYTIC_SCHEMAS[names[0]]
+    properties: Dict[str, Any] = {}
+    for name in names:
+        properties.update(ANALYTIC_SCHEMAS[name]["properties"])
+    return {"type": "object", "properties": properties, "required": list(properties)}
+
+
+# --- Parsing & repair ---
+def _strip_wrapping(text: str) -> str:
+    # The model sometimes wraps the object in ```json fences or adds prose around it
+    start = text.find("{")
+    return text[start:] if start != -1 else text
+
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def repair_json(text: str) -> str:
+    """Best-effort fix-up of truncated model JSON.
+
+    Scans the text once, and if the root object never closes, cuts it back to
+    the last complete member and closes every bracket still open. Raises
+    ValueError if no JSON object can be recovered.
+    """
+    text = _strip_wrapping(text)
+    stack: List[str] = []
+    in_string = escape = False
+    # (cut index, brackets open at that point), right after complete values
+    cuts: List[Tuple[int, Tuple[str, ...]]] = []
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(ch)
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return re.sub(r",\s*([}\]])", r"\1", text[:i + 1])
+            cuts.append((i + 1, tuple(stack)))
+        elif ch == ",":
+            cuts.append((i, tuple(stack)))
+
+    def close(prefix: str, open_brackets) -> str:
+        prefix = re.sub(r",\s*([}\]])", r"\1", prefix.rstrip().rstrip(","))
+        return prefix + "".join(_CLOSERS[b] for b in reversed(open_brackets))
+
+    candidates = []
+    if stack:
+        # keep a half-written trailing value, useful while streaming
+        candidates.append(close(text + '"' if in_string else text, stack))
+    candidates.extend(close(text[:index], open_brackets) for index, open_brackets in reversed(cuts[-200:]))
+    for candidate in candidates:
+        try:
+            _loads(candidate)
+            return candidate
+        except ValueError:
+            continue
+    raise ValueError("response could not be repaired into a JSON object")
+
+
+def parse_json(text: str) -> Tuple[Any, bool]:
+    """Parse model output; returns (data, repaired). Raises ValueError if unrecoverable."""
+    stripped = _strip_wrapping(text).rstrip().rstrip("`").rstrip()
+    try:
+        return _loads(stripped), False
+    except ValueError:
+        return _loads(repair_json(text)), True
+
+
+def tidy_json_text(text: str) -> str:
+    """Pretty-printed (and, if needed, repaired) JSON text, or `text` unchanged if it isn't JSON."""
+    try:
+        data, _ = parse_json(text)
+    except ValueError:
+        return text
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+# --- Typed records ---
+@dataclass
+class Event:
+    section: str
+    timestamp: Optional[str]
+    text: str
+    fields: Dict[str, Any]
+
+
+@dataclass
+class AnalyticResult:
+    analytic: str
+    data: Dict[str, Any]
+    events: List[Event] = field(default_factory=list)
+    repaired: bool = False
+
+
+def parse_result(analytic: str, text: str) -> AnalyticResult:
+    """Parse an analytic's response into typed records.
+
+    `data` is the object under the analytic's root key and `events` flattens
+    every list of timestamped items (incidents, timeline samples, steps...).
+    """
+    parsed, repaired = parse_json(text)
+    root_key = next(iter(ANALYTIC_SCHEMAS[analytic]["properties"]))
+    data = parsed.get(root_key, parsed) if isinstance(parsed, dict) else {}
+
+    events = []
+    for section, value in data.items():
+        if not isinstance(value, list):
+            continue
+        for item in value:
+            if not isinstance(item, dict):
+                continue
+            text_value = next((str(item[k]) for k in TEXT_FIELDS if k in item), "")
+            events.append(Event(
+                section=section,
+                timestamp=item.get("timestamp") or item.get("start"),
+                text=text_value,
+                fields=item,
+            ))
+    return AnalyticResult(analytic=analytic, data=data, events=events, repaired=repaired)
@@ -0,0 +1,126 @@
+# analytics/upload_lifecycle.py
+"""Garbage collection of uploaded Gemini files.
+
+The Files API keeps every upload for 48 hours and counts it against the
+project's storage quota until then, so files nothing uses any more are
+deleted in bulk instead of being left to expire:
+
+- registered uploads that expired, or that no analysis has used for
+  `idle_seconds`, are unregistered and deleted;
+- with `delete_unregistered` on, remote files missing from the registry (left
+  over from crashed runs or replaced by a re-upload) are deleted once older
+  than `orphan_grace_seconds`. It is off by default because anything else
+  uploading with the same API key would lose its files.
+
+`collect_garbage()` runs one pass; `start_scheduler()` repeats it on a daemon
+thread every `gc_interval_seconds`.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from google.genai import errors
+
+from config import upload_lifecycle_config
+from . import gemini_client, gemini_files
+from .gemini_files import _is_expired, _parse_time, retire_upload
+from .metrics import metrics
+
+
+def _is_idle(record: Dict[str, Any], now: datetime) -> bool:
+    last_used = _parse_time(record.get("last_used_at")) or _parse_time(record.get("uploaded_at"))
+    return last_used is None or now - last_used >= timedelta(seconds=upload_lifecycle_config["idle_seconds"])
+
+
+def _delete(name: str) -> bool:
+    try:
+        gemini_client.delete_file(name)
+        return True
+    except errors.ClientError as e:
+        # already gone (expired or deleted elsewhere) counts as collected
+        if e.code == 404:
+            return True
+        print(f"Could not delete uploaded file {name}: {e}")
+    except Exception as e:
+        print(f"Could not delete uploaded file {name}: {e}")
+    return False
+
+
+def collect_garbage(dry_run: bool = False) -> Dict[str, Any]:
+    """Delete expired, idle and orphaned uploads; returns what was (or would be) deleted."""
+    now = datetime.now(timezone.utc)
+    doomed: List[str] = []
+    reasons = {"expired": 0, "idle": 0, "orphaned": 0}
+
+    for digest, record in gemini_files.registry.records().items():
+        reason = "expired" if _is_expired(record, timedelta(0)) else "idle" if _is_idle(record, now) else None
+        if reason is None:
+            continue
+        if not dry_run:
+            # re-checked under the upload's lock so a file picked up by a job meanwhile is kept
+            record = retire_upload(digest, lambda r: _is_expired(r, timedelta(0)) or _is_idle(r, datetime.now(timezone.utc)))
+            if record is None:
+                continue
+        doomed.append(record["name"])
+        reasons[reason] += 1
+
+    if upload_lifecycle_config["delete_unregistered"]:
+        registered = {record["name"] for record in gemini_files.registry.records().values()}
+        grace = timedelta(seconds=upload_lifecycle_config["orphan_grace_seconds"])
+        try:
+            remote_files = gemini_client.list_files()
+        except Exception as e:
+            print(f"Could not list uploaded files: {e}")
+            remote_files = []
+        for file in remote_files:
+            created = _parse_time(getattr(file, "create_time", None))
+            if file.name in registered or file.name in doomed or (created is not None and now - created < grace):
+                continue
+            doomed.append(file.name)
+            reasons["orphaned"] += 1
+
+    deleted = 0
+    if doomed and not dry_run:
+        with ThreadPoolExecutor(max_workers=upload_lifecycle_config["max_delete_workers"]) as pool:
+            deleted = sum(pool.map(_delete, doomed))
+        metrics.inc("uploads_deleted_total", deleted)
+    if doomed:
+        print(f"Upload GC {'would delete' if dry_run else 'deleted'} {len(doomed) if dry_run else deleted}/{len(doomed)} files "
+              f"({reasons['expired']} expired, {reasons['idle']} idle, {reasons['orphaned']} orphaned)")
+    return {"candidates": doomed, "deleted": deleted, **reasons}
+
+
+# --- Scheduling ---
+_scheduler: Optional[threading.Thread] = None
+_scheduler_lock = threading.Lock()
+_stop = threading.Event()
+
+
+def _run_forever(interval: float):
+    while not _stop.wait(interval):
+        try:
+            collect_garbage()
+        except Exception as e:
+            print(f"Upload GC pass failed: {e}")
+
+
+def start_scheduler(interval: Optional[float] = None) -> threading.Thread:
+    """Run collect_garbage every `interval` seconds on a daemon thread (once per process)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _stop.clear()
+            _scheduler = threading.Thread(
+                target=_run_forever, args=(interval or upload_lifecycle_config["gc_interval_seconds"],),
+                name="upload-gc", daemon=True,
+            )
+            _scheduler.start()
+        return _scheduler
+
+
+def stop_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        _stop.set()
+        _scheduler = None
@@ -1,9 +1,16 @@
 import gradio as gr
-import importlib
+import atexit
 import os
 import shutil
 
-import torch
+from analytics import startup
+
+with startup.timed("import", "analytics core"):
+    from analytics.fanout import analyze_all
+    from analytics.metrics import metrics, serve as serve_metrics
+    from analytics.prompts import ANALYTIC_PROMPTS
+    from analytics.upload_lifecycle import start_scheduler as start_upload_gc, stop_scheduler as stop_upload_gc
+from config import metrics_config, startup_config
 
 # --- Local Storage Configuration ---
 UPLOADS_DIR = "uploads"
@@ -12,8 +19,35 @@ os.makedirs(UPLOADS_DIR, exist_ok=True)
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
-print(f"CUDA available: {torch.cuda.is_available()}")
-print(f"Torch device: {torch.device('cuda' if torch.cuda.is_available() else 'cpu')}")
+# Tabs in display order: (title, module in analytics/). Modules are imported when the UI is
+# built; their heavy models are loaded by warm-up tasks or on first use.
+TABS = [
+    ("Face Recognition", "face_recognition"), ("People Behaviour", "people_behaviour"),
+    ("Staff Behaviour", "staff_behaviour"), ("Hygiene", "hygiene"), ("Safety", "safety"),
+    ("Time Monitering", "time_monitering"), ("Customer Requirements", "customer_requirements"),
+    ("Following Cooking Steps", "following_cooking_steps"), ("Occupancy", "occupancy"),
+    ("Queue Length", "queue_length"), ("Operational Efficiency", "operational_efficiency"),
+]
+
+
+def _report_device():
+    import torch
+    print(f"CUDA available: {torch.cuda.is_available()}")
+    print(f"Torch device: {torch.device('cuda' if torch.cuda.is_available() else 'cpu')}")
+
+
+def _warm_face_models():
+    from analytics import face_recognition
+    face_recognition.warm_up()
+
+
+def _warm_gemini_client():
+    from analytics.gemini_client import get_client
+    get_client()
+
+
+# Slow initialisations run after the UI is built (startup_config["background_warm_up"])
+WARM_UP_TASKS = {"torch": _report_device, "face models": _warm_face_models, "gemini client": _warm_gemini_client}
 
 def get_video_files():
     return [f for f in os.listdir(UPLOADS_DIR) if f.endswith(('.mp4', '.avi', '.mov'))]
@@ -45,28 +79,31 @@ def create_ui():
                 initial_video_player_value = os.path.join(UPLOADS_DIR, get_video_files()[0]) if get_video_files() else None
                 video_player = gr.Video(label="Video Player", value=initial_video_player_value)
 
+                analytics_selector = gr.CheckboxGroup(
+                    label="Analytics to run",
+                    choices=[(name.replace("_", " ").title(), name) for name in ANALYTIC_PROMPTS],
+                    value=list(ANALYTIC_PROMPTS),
+                )
+                combined_mode = gr.Checkbox(label="Combined mode (one model call for all selected analytics)", value=False)
+                refresh_cache = gr.Checkbox(label="Bypass cached results", value=False)
                 analyze_button = gr.Button("Analyze", variant="secondary")
             
             with gr.Column(scale=0, min_width=25):
                 toggle_button = gr.Button("<<")
 
             with gr.Column(scale=4) as right_panel:
+                # Result box of each Gemini analytics tab, keyed by module name
+                analysis_outputs = {}
                 with gr.Tabs() as tabs:
-                    tab_names = [
-                        "Face Recognition", "People Behaviour", "Staff Behaviour", "Hygiene",
-                        "Safety", "Time Monitering", "Customer Requirements",
-                        "Following Cooking Steps", "Occupancy", "Queue Length", "Operational Efficiency"
-                    ]
-                    for tab_name in tab_names:
+                    for tab_name, module_name in TABS:
                         with gr.Tab(tab_name):
-                            module_name = tab_name.lower().replace(" ", "_")
                             try:
-                                module = importlib.import_module(f"analytics.{module_name}")
+                                module = startup.import_module(f"analytics.{module_name}")
                                 # Pass analyze_button and video_player to create_tab
                                 if tab_name == "Face Recognition":
                                     module.create_tab(analyze_button, video_player)
                                 else:
-                                    module.create_tab(video_player)
+                                    analysis_outputs[module_name] = module.create_tab(video_player)
                             except (ImportError, AttributeError) as e:
                                 gr.Markdown(f"Error loading module for {tab_name}: {e}")
 
@@ -90,6 +127,18 @@ def create_ui():
                     return gr.update(value=path), gr.update(variant="primary"), gr.update(value=selected_filename)
             return gr.update(), gr.update(), gr.update()
 
+        def analyze_selected(video_path, selected, combined, refresh):
+            # Upload once, run every selected analytic concurrently and stream into each tab as it answers
+            names = list(analysis_outputs)
+            results = {name: gr.update() for name in names}
+            selected = [name for name in selected if name in analysis_outputs]
+            for name in selected:
+                results[name] = "Analyzing..."
+            yield [results[name] for name in names]
+            for name, text in analyze_all(video_path, selected, combined=combined, refresh=refresh, stream=True):
+                results[name] = text
+                yield [results[name] for name in names]
+
         def toggle_left_panel(is_visible):
             is_visible = not is_visible
             return gr.update(visible=is_visible), gr.update(value=">>" if not is_visible else "<<"), is_visible
@@ -98,11 +147,24 @@ def create_ui():
         
         video_dropdown.change(play_video, inputs=[video_dropdown, uploaded_file_paths], outputs=[video_player, analyze_button, selected_video_display])
 
+        analyze_button.click(analyze_selected, inputs=[video_player, analytics_selector, combined_mode, refresh_cache], outputs=list(analysis_outputs.values()))
+
         left_panel_visible = gr.State(True)
         toggle_button.click(toggle_left_panel, inputs=[left_panel_visible], outputs=[left_panel, toggle_button, left_panel_visible])
 
     return demo
 
 if __name__ == "__main__":
-    demo = create_ui()
+    if metrics_config["enabled"]:
+        serve_metrics(metrics_config["host"], metrics_config["port"])
+    if metrics_config.get("json_dump_path"):
+        atexit.register(metrics.dump_json, metrics_config["json_dump_path"])
+    start_upload_gc()
+    atexit.register(stop_upload_gc)
+    with startup.timed("build", "ui"):
+        demo = create_ui()
+    if startup_config["background_warm_up"]:
+        startup.warm_up_in_background(WARM_UP_TASKS, report=startup_config["report"])
+    if startup_config["report"]:
+        print(startup.startup_report())
     demo.launch()
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""Headless batch runner: selected analytics over many videos into a JSONL file.
+
+    python batch_run.py recordings/ --analytics hygiene,safety --concurrency 4 --output results.jsonl
+    python batch_run.py "recordings/**/*.mp4" --output nightly.jsonl
+
+Every (video, analytic) result is appended to the output as one JSON line and
+flushed to disk right away, so the output file doubles as the checkpoint:
+re-running the same command after a crash skips every pair that already has a
+successful line and only redoes the rest. Pairs are matched on the video's
+content hash, so moved or renamed recordings are not analyzed twice.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Set, Tuple
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+
+def find_videos(inputs: Iterable[str]) -> List[str]:
+    """Expand directories (recursively) and glob patterns into a sorted list of video files."""
+    videos = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                videos.update(os.path.join(root, f) for f in files if f.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            matches = glob.glob(item, recursive=True) or ([item] if os.path.isfile(item) else [])
+            videos.update(m for m in matches if os.path.isfile(m) and m.lower().endswith(VIDEO_EXTENSIONS))
+    return sorted(os.path.abspath(v) for v in videos)
+
+
+def load_checkpoint(output_path: str) -> Set[Tuple[str, str]]:
+    """Return the (video hash, analytic) pairs already finished in `output_path`.
+
+    A line cut short by a crash is truncated away so new lines start cleanly.
+    """
+    done: Set[Tuple[str, str]] = set()
+    if not os.path.exists(output_path):
+        return done
+    valid_bytes = 0
+    with open(output_path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                break
+            valid_bytes += len(raw)
+            if record.get("ok"):
+                done.add((record["video_sha256"], record["analytic"]))
+    if valid_bytes < os.path.getsize(output_path):
+        print(f"Dropping an incomplete trailing record from {output_path}")
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return done
+
+
+class JsonlWriter:
+    """Thread-safe appender that makes every line durable before returning."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run analytics over a directory or glob of videos into JSONL.")
+    parser.add_argument("inputs", nargs="+", help="video files, directories or glob patterns (quote globs)")
+    parser.add_argument("--analytics", default="all", help="comma-separated analytics to run (default: all)")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file to append results to (also the checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=2, help="videos processed at once")
+    parser.add_argument("--analytic-workers", type=int, default=None, help="analytics run in parallel per video")
+    parser.add_argument("--combined", action="store_true", help="answer all analytics of a video with one model call")
+    parser.add_argument("--refresh", action="store_true", help="ignore cached responses")
+    parser.add_argument("--backend", choices=("gemini", "standin"), help="override client_config['backend']")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.backend:
+        # must be set before the analytics modules build their client
+        os.environ["GEMINI_BACKEND"] = args.backend
+
+    from analytics.fanout import MAX_WORKERS, analyze_all
+    from analytics.gemini_files import hash_file
+    from analytics.prompts import ANALYTIC_PROMPTS
+    from analytics.structured import parse_result
+    from analytics.upload_lifecycle import collect_garbage, start_scheduler, stop_scheduler
+
+    names = list(ANALYTIC_PROMPTS) if args.analytics == "all" else [n.strip() for n in args.analytics.split(",") if n.strip()]
+    unknown = [n for n in names if n not in ANALYTIC_PROMPTS]
+    if unknown:
+        print(f"Unknown analytics: {', '.join(unknown)} (choose from {', '.join(ANALYTIC_PROMPTS)})")
+        return 2
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("No videos found.")
+        return 1
+
+    done = load_checkpoint(args.output)
+    writer = JsonlWriter(args.output)
+    counts = {"ok": 0, "failed": 0, "skipped": 0}
+    counts_lock = threading.Lock()
+
+    def process(video: str):
+        video_hash = hash_file(video)
+        pending = [name for name in names if (video_hash, name) not in done]
+        with counts_lock:
+            counts["skipped"] += len(names) - len(pending)
+        if not pending:
+            return
+        start = time.perf_counter()
+        finished = set()
+        try:
+            for name, text in analyze_all(video, pending, max_workers=args.analytic_workers or MAX_WORKERS,
+                                          combined=args.combined, refresh=args.refresh):
+                finished.add(name)
+                record = {"video": video, "video_sha256": video_hash, "analytic": name}
+                try:
+                    result = parse_result(name, text)
+                    record.update(ok=True, result=result.data, event_count=len(result.events), repaired=result.repaired)
+                except (ValueError, AttributeError):
+                    record.update(ok=False, error=text)
+                record.update(elapsed_seconds=round(time.perf_counter() - start, 3),
+                              finished_at=datetime.now(timezone.utc).isoformat())
+                writer.write(record)
+                with counts_lock:
+                    counts["ok" if record["ok"] else "failed"] += 1
+                print(f"{'ok    ' if record['ok'] else 'FAILED'} {os.path.basename(video)} {name} ({record['elapsed_seconds']:.1f}s)")
+        except Exception as e:
+            # e.g. the video can't be opened: record the rest as failed so the run carries on
+            for name in pending:
+                if name not in finished:
+                    writer.write({"video": video, "video_sha256": video_hash, "analytic": name, "ok": False,
+                                  "error": f"{type(e).__name__}: {e}", "finished_at": datetime.now(timezone.utc).isoformat()})
+                    with counts_lock:
+                        counts["failed"] += 1
+            print(f"FAILED {os.path.basename(video)}: {e}")
+
+    print(f"{len(videos)} videos x {len(names)} analytics, {len(done)} results already in {args.output}")
+    start_scheduler()
+    pool = ThreadPoolExecutor(max_workers=max(1, args.concurrency))
+    try:
+        for future in as_completed([pool.submit(process, video) for video in videos]):
+            future.result()
+    except KeyboardInterrupt:
+        print("Interrupted; finished results are saved, re-run the same command to resume.")
+        pool.shutdown(wait=False, cancel_futures=True)
+        return 130
+    finally:
+        pool.shutdown(wait=True)
+        writer.close()
+        # the closing pass below (or an interrupted run) shouldn't race a scheduled one
+        stop_scheduler()
+
+    print(f"Done: {counts['ok']} ok, {counts['failed']} failed, {counts['skipped']} already done")
+    collect_garbage()
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
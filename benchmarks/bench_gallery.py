@@ -0,0 +1,149 @@
+"""Query latency of the face gallery backends against gallery size.
+
+Fills each backend in analytics/face_index.py with random unit-length 512-d
+vectors (FaceNet embeddings are L2-normalised) and times, per gallery size:
+
+- batch: one `query` call for all probes, as face_video and the sync do;
+- single: one `query` call per probe, as Verify does;
+
+and reports p50/p95 latency of each call and the per-probe cost. Backends
+whose dependency is missing (chromadb) are reported as skipped.
+
+    python benchmarks/bench_gallery.py
+    python benchmarks/bench_gallery.py --sizes 1000,10000,50000 --probes 200 --top-k 5 --json gallery.json
+
+Indexes are built in a temporary directory, never in data/.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from analytics.face_index import GalleryIndex, open_index  # noqa: E402
+
+BACKENDS = ["numpy", "chroma"]
+DIMENSIONS = 512
+# Rows per `add` call while filling a gallery
+ADD_BATCH = 1000
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", default=",".join(BACKENDS), help=f"comma-separated subset of: {', '.join(BACKENDS)}")
+    parser.add_argument("--sizes", default="100,1000,5000,20000", help="comma-separated gallery sizes")
+    parser.add_argument("--probes", type=int, default=100, help="probe embeddings per query batch")
+    parser.add_argument("--top-k", type=int, default=1, help="n_results per probe")
+    parser.add_argument("--repeats", type=int, default=5, help="timed batch queries per size")
+    parser.add_argument("--dtype", default="float32", help="numpy backend storage dtype")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", dest="json_path", help="also write results to this file")
+    return parser.parse_args(argv)
+
+
+def random_embeddings(rng: np.random.Generator, count: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, DIMENSIONS)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def fill(index: GalleryIndex, gallery: np.ndarray) -> float:
+    start = time.perf_counter()
+    for offset in range(0, len(gallery), ADD_BATCH):
+        rows = gallery[offset:offset + ADD_BATCH]
+        index.add(ids=[f"face-{offset + i}" for i in range(len(rows))], embeddings=rows.tolist(),
+                  metadatas=[{"name": f"person-{(offset + i) % 500}"} for i in range(len(rows))])
+    return time.perf_counter() - start
+
+
+def time_calls(call: Callable[[], Any], repeats: int) -> List[float]:
+    call()  # warm-up: first query loads pages / builds lazy structures
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_size(backend: str, size: int, args: argparse.Namespace, state_dir: str) -> Dict[str, Any]:
+    rng = np.random.default_rng(args.seed + size)
+    gallery = random_embeddings(rng, size)
+    # probes are noisy copies of gallery faces, as real probes would be
+    probes = gallery[rng.integers(0, size, args.probes)] + 0.05 * random_embeddings(rng, args.probes)
+    probe_list = probes.tolist()
+
+    index = open_index(backend, os.path.join(state_dir, f"{backend}-{size}"), dtype=args.dtype)
+    fill_seconds = fill(index, gallery)
+    batch = time_calls(lambda: index.query(query_embeddings=probe_list, n_results=args.top_k,
+                                           include=["metadatas", "distances"]), args.repeats)
+    single_probes = probe_list[:min(len(probe_list), 50)]
+    single = time_calls(lambda: [index.query(query_embeddings=[probe], n_results=args.top_k,
+                                             include=["metadatas", "distances"]) for probe in single_probes], 1)
+    single = [seconds / len(single_probes) for seconds in single]
+    return {
+        "backend": backend,
+        "size": size,
+        "fill_seconds": fill_seconds,
+        "batch_p50": percentile(batch, 0.5),
+        "batch_p95": percentile(batch, 0.95),
+        "batch_per_probe": percentile(batch, 0.5) / args.probes,
+        "single_per_probe": percentile(single, 0.5),
+    }
+
+
+def _ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value * 1000:.3f}"
+
+
+def print_report(results: List[Dict[str, Any]], probes: int):
+    print(f"\n{'backend':<9}{'size':>8}{'fill s':>9}{'batch p50 ms':>14}{'batch p95 ms':>14}"
+          f"{'ms/probe (batch)':>18}{'ms/probe (single)':>19}")
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['backend']:<9}{result.get('size', ''):>8}  skipped ({result['skipped']})")
+            continue
+        print(f"{result['backend']:<9}{result['size']:>8}{result['fill_seconds']:>9.2f}{_ms(result['batch_p50']):>14}"
+              f"{_ms(result['batch_p95']):>14}{_ms(result['batch_per_probe']):>18}{_ms(result['single_per_probe']):>19}")
+    print(f"\nbatch = one query for {probes} probes; single = one query per probe")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        raise SystemExit(f"Unknown backends: {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_gallery_") as state_dir:
+        for backend in backends:
+            for size in sizes:
+                print(f"Benchmarking {backend} with {size} faces ({args.probes} probes, top {args.top_k})...")
+                try:
+                    results.append(bench_size(backend, size, args, state_dir))
+                except ImportError as e:
+                    results.append({"backend": backend, "skipped": f"{e}"})
+                    break
+
+    print_report(results, args.probes)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""End-to-end latency/throughput benchmark of the analytics pipeline.
+
+Drives every `analyze_<name>_video` handler plus the face recognition path on
+one video and reports p50/p95 latency and throughput per path, followed by the
+per-stage breakdown recorded in analytics.metrics. Runs against the offline
+Gemini stand-in (analytics/standin.py) unless --live is given, so it costs no
+quota and can be repeated for every performance change.
+
+    python benchmarks/bench_pipeline.py uploads/kitchen.mp4 --iterations 10 --concurrency 4
+    python benchmarks/bench_pipeline.py clip.mp4 --paths hygiene,safety --error-rate 0.05 --json results.json
+
+All local state (response cache, upload registry, preprocessed videos, face
+database) lives in a temporary directory (ANALYTICS_DATA_DIR, set before any
+analytics module is imported), so a benchmark never touches the app's real
+data/ state.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+ANALYTIC_PATHS = [
+    "people_behaviour", "staff_behaviour", "hygiene", "safety", "time_monitering", "customer_requirements",
+    "following_cooking_steps", "occupancy", "queue_length", "operational_efficiency",
+]
+FACE_PATH = "face_recognition"
+# Handler outputs that start with these are failures rather than answers
+FAILURE_PREFIXES = ("Upload processed but never became ACTIVE", "Gemini is currently unavailable", "Gemini request failed")
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("video", help="video file every path is run on")
+    parser.add_argument("--paths", default="all", help=f"comma-separated subset of: {', '.join(ANALYTIC_PATHS + [FACE_PATH])}")
+    parser.add_argument("--iterations", type=int, default=5, help="runs per path")
+    parser.add_argument("--concurrency", type=int, default=1, help="runs of a path in flight at once")
+    parser.add_argument("--warm", action="store_true", help="keep response cache and uploads between runs")
+    parser.add_argument("--live", action="store_true", help="call the real Gemini API instead of the stand-in")
+    parser.add_argument("--latency", type=float, help="stand-in median generate latency in seconds")
+    parser.add_argument("--error-rate", type=float, help="stand-in share of calls failing with 503")
+    parser.add_argument("--rate-limit-rate", type=float, help="stand-in share of calls failing with 429")
+    parser.add_argument("--seed", type=int, default=0, help="stand-in random seed")
+    parser.add_argument("--json", dest="json_path", help="also write results and stage metrics to this file")
+    return parser.parse_args(argv)
+
+
+def configure_backend(args: argparse.Namespace, state_dir: str):
+    """Select the backend and the data directory before any analytics module is imported."""
+    os.environ["ANALYTICS_DATA_DIR"] = state_dir
+    if args.live:
+        os.environ["GEMINI_BACKEND"] = "gemini"
+        return
+    os.environ["GEMINI_BACKEND"] = "standin"
+    from config import standin_config
+    standin_config["seed"] = args.seed
+    for option, key in (("latency", "latency_median"), ("error_rate", "error_rate"), ("rate_limit_rate", "rate_limit_rate")):
+        if getattr(args, option) is not None:
+            standin_config[key] = getattr(args, option)
+
+
+def isolate_state(state_dir: str, warm: bool):
+    """Point the response cache and upload registry at `state_dir`; a cold cache keeps nothing."""
+    from analytics import gemini_files, pipeline
+    from analytics.response_cache import ResponseCache
+
+    pipeline.response_cache = ResponseCache(
+        os.path.join(state_dir, "response_cache.sqlite3"), **({} if warm else {"max_bytes": 0})
+    )
+    gemini_files.registry = gemini_files.UploadRegistry(os.path.join(state_dir, "gemini_uploads.json"))
+    gemini_files._active_handles.clear()
+
+
+def load_handler(path: str) -> Callable[[str], Any]:
+    module = importlib.import_module(f"analytics.{path}")
+    if path == FACE_PATH:
+        return module.verify_user_image
+    return getattr(module, f"analyze_{path}_video")
+
+
+def run_once(handler: Callable[[str], Any], video: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    result = handler(video)
+    if hasattr(result, "__next__"):
+        # Gradio generator handlers: the last value yielded is the answer
+        for result in result:
+            pass
+    elapsed = time.perf_counter() - start
+    failed = (isinstance(result, str) and result.startswith(FAILURE_PREFIXES)) or (isinstance(result, dict) and "error" in result)
+    return {"seconds": elapsed, "ok": not failed}
+
+
+def bench_path(path: str, video: str, iterations: int, concurrency: int, state_dir: str, warm: bool) -> Dict[str, Any]:
+    try:
+        handler = load_handler(path)
+    except Exception as e:
+        return {"path": path, "skipped": f"{type(e).__name__}: {e}"}
+
+    isolate_state(os.path.join(state_dir, path), warm)
+    errors: List[str] = []
+
+    def guarded(_):
+        try:
+            return run_once(handler, video)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        runs = [run for run in pool.map(guarded, range(iterations)) if run is not None]
+    wall = time.perf_counter() - start
+
+    latencies = [run["seconds"] for run in runs if run["ok"]]
+    return {
+        "path": path,
+        "runs": iterations,
+        "ok": len(latencies),
+        "failed": iterations - len(latencies),
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+        "throughput": len(latencies) / wall if wall else None,
+        "errors": errors[:5],
+    }
+
+
+def _fmt(value: Optional[float], digits: int = 2) -> str:
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def print_report(results: List[Dict[str, Any]], stages: List[Dict[str, Any]]):
+    print(f"\n{'path':<26}{'ok/runs':>9}{'p50 s':>9}{'p95 s':>9}{'mean s':>9}{'runs/s':>9}")
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['path']:<26}  skipped ({result['skipped']})")
+            continue
+        print(f"{result['path']:<26}{result['ok']:>4}/{result['runs']:<4}{_fmt(result['p50']):>9}{_fmt(result['p95']):>9}"
+              f"{_fmt(result['mean']):>9}{_fmt(result['throughput'], 3):>9}")
+        for error in result["errors"]:
+            print(f"    {error}")
+
+    print(f"\n{'stage':<14}{'analytic':<26}{'count':>7}{'p50 s':>9}{'p95 s':>9}")
+    for series in sorted(stages, key=lambda s: (s["labels"].get("stage", ""), s["labels"].get("analytic", ""))):
+        labels = series["labels"]
+        print(f"{labels.get('stage', ''):<14}{labels.get('analytic', ''):<26}{series['count']:>7}"
+              f"{_fmt(series['p50'], 3):>9}{_fmt(series['p95'], 3):>9}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = ANALYTIC_PATHS + [FACE_PATH] if args.paths == "all" else [p.strip() for p in args.paths.split(",") if p.strip()]
+    unknown = [p for p in paths if p not in ANALYTIC_PATHS + [FACE_PATH]]
+    if unknown:
+        raise SystemExit(f"Unknown paths: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix="bench_state_") as state_dir:
+        configure_backend(args, state_dir)
+        from analytics.metrics import metrics
+
+        results = []
+        for path in paths:
+            print(f"Benchmarking {path} ({args.iterations} runs, concurrency {args.concurrency})...")
+            results.append(bench_path(path, args.video, args.iterations, args.concurrency, state_dir, args.warm))
+
+    stages = metrics.to_dict()["histograms"].get("stage_duration_seconds", [])
+    print_report(results, stages)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results, "stages": stages, "metrics": metrics.to_dict()}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
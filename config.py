@@ -17,8 +17,8 @@ config={
 
 
 # --- Structured output / formatting ---
-"response_mime_type": "text/plain", # "text/plain" = freeform text, "application/json" = structured JSON.
-# "response_json_schema": <dict>, # JSON schema (only if response_mime_type="application/json").
+"response_mime_type": "application/json", # "text/plain" = freeform text, "application/json" = structured JSON.
+# "response_json_schema": <dict>, # set per analytic from analytics/structured.py (only if response_mime_type="application/json").
 
 
 # --- Decoding / generation penalties & control ---
@@ -35,3 +35,117 @@ config={
 # --- Additional model-level fields ---
 # "max_input_tokens": 32768, # int. Max number of tokens allowed in input prompt (Gemini 2.5 Flash).
 }
+
+# --- Pre-upload video reduction (see analytics/preprocess.py) ---
+preprocess_config = {
+"enabled": True, # bool. Set False to upload the original file untouched.
+"max_width": 1280, # int. Frames are downscaled (never upscaled) to fit max_width x max_height.
+"max_height": 720, # int.
+"target_fps": 2.0, # float. Frames kept per second of footage; the prompts only need ~1-2 fps.
+"motion_gate": True, # bool. Cut static stretches (see analytics/motion_gate.py); timestamps are mapped back to original time.
+"motion_gate_min_duration": 900, # float seconds. Only recordings at least this long are gated, short clips are sent whole.
+"camera_rois": {}, # dict. {"<video filename prefix>": [x, y, w, h]} crop in source pixels, e.g. {"kitchen_cam1": [0, 120, 1280, 600]}.
+}
+
+# --- Gemini client limits (see analytics/gemini_client.py) ---
+client_config = {
+"backend": "gemini", # "gemini" or "standin" (offline fake, see analytics/standin.py); the GEMINI_BACKEND env var overrides it.
+"requests_per_minute": 60, # int. Model calls started per minute across the whole process; keep below the project's quota.
+"tokens_per_minute": 1000000, # int. Input + output tokens per minute; calls are reserved from an estimate and settled with the real usage.
+"max_in_flight": 8, # int. Model calls running at the same time; further callers wait in FIFO order.
+}
+
+# --- Per-analytic video sampling (see analytics/sampling.py) ---
+# "<analytic>": {"fps": float, "start_offset": float seconds, "end_offset": float seconds, "media_resolution": "low" | "medium" | "high"}
+# Analytics not listed (or keys left out) use the model default: 1 fps, whole clip, default resolution.
+# fps above preprocess_config["target_fps"] gains nothing, those frames were already dropped.
+sampling_config = {
+"occupancy": {"fps": 0.2, "media_resolution": "low"}, # head counts change over minutes, not seconds.
+"queue_length": {"fps": 0.5, "media_resolution": "low"}, # queue size only.
+"time_monitering": {"fps": 0.5}, # start/end of long activities.
+"operational_efficiency": {"fps": 0.5},
+"hygiene": {"fps": 2.0}, # hand-to-face / hand-to-hair contact lasts about a second.
+"safety": {"fps": 2.0}, # slips and spills are brief.
+}
+
+# --- Inline video vs Files API (see analytics/gemini_files.py get_video_part) ---
+inline_video_config = {
+"enabled": True, # bool. Send small clips inside the request instead of uploading them and waiting for ACTIVE.
+"max_bytes": 14 * 1024 * 1024, # int. Largest clip sent inline. Requests are capped at 20 MB and inline bytes grow by a third as base64.
+}
+
+# --- Retries / circuit breaker (see analytics/resilience.py) ---
+resilience_config = {
+"max_attempts": 5, # int. Tries per call for retryable errors (429, 5xx, timeouts, dropped connections).
+"breaker_failure_threshold": 5, # int. Consecutive failures of one operation (generate, upload, get_file) that open its circuit.
+"breaker_reset_seconds": 30, # float. How long an open circuit fails fast before letting one probe call through.
+"hedge_requests": False, # bool. Send a second generate request when the first outlives the recent p95 latency (costs quota).
+"hedge_min_samples": 20, # int. Latency samples needed before the p95 hedge deadline is trusted.
+}
+
+# --- Metrics endpoint (see analytics/metrics.py) ---
+metrics_config = {
+"enabled": True, # bool. Serve /metrics (Prometheus text) and /metrics.json while the app runs.
+"host": "127.0.0.1", # str. Keep on localhost unless a scraper on another machine needs it.
+"port": 9464, # int.
+"json_dump_path": "data/metrics.json", # str or None. Metrics are written here when the app exits.
+}
+
+# --- Offline Gemini stand-in (see analytics/standin.py) ---
+standin_config = {
+"latency_median": 2.0, # float seconds. Median generate_content latency; samples are log-normal around it.
+"latency_sigma": 0.4, # float. Spread of the log-normal latency (0 = always the median).
+"first_chunk_fraction": 0.6, # float [0-1]. Share of a streamed call's latency spent before the first chunk.
+"stream_chunks": 8, # int. Chunks a streamed answer is split into.
+"upload_bytes_per_second": 50 * 1024 * 1024, # float. Simulated upload bandwidth.
+"processing_bytes_per_second": 20 * 1024 * 1024, # float. How fast uploads move from PROCESSING to ACTIVE.
+"min_processing_seconds": 1.0, # float.
+"files_api_latency": 0.05, # float seconds per get/delete call.
+"cache_create_latency": 1.0, # float seconds to create a context cache.
+"min_cache_tokens": 1024, # int. Smaller context caches are rejected with 400, like the real minimum for 2.5 Flash.
+"error_rate": 0.0, # float [0-1]. Share of calls failing with 503.
+"rate_limit_rate": 0.0, # float [0-1]. Share of calls failing with 429.
+"canned_dir": None, # str or None. Directory of <analytic>.json answers; otherwise answers are generated from the schema.
+"seed": None, # int or None. Seed for latencies, errors and generated answers.
+}
+
+# --- Context caching (see analytics/context_cache.py) ---
+context_cache_config = {
+"enabled": True, # bool. Cache the uploaded video once when several analytics run on it together.
+"min_prompts": 2, # int. Fewer prompts than this on one video are sent uncached (cache storage isn't free).
+"ttl_seconds": 900, # int. Cache lifetime; extended at half-life while analyses still use it.
+"delete_when_done": True, # bool. Delete the cache as soon as the last analysis using it finishes.
+}
+
+# --- Uploaded file garbage collection (see analytics/upload_lifecycle.py) ---
+upload_lifecycle_config = {
+"gc_interval_seconds": 3600, # float. How often the background pass runs in the app and in batch runs.
+"idle_seconds": 6 * 3600, # float. Registered uploads unused for this long are deleted (they are re-uploaded if needed again).
+"delete_unregistered": False, # bool. Also delete remote files the registry doesn't know. Only turn on if nothing else uploads with this API key.
+"orphan_grace_seconds": 3600, # float. Unregistered files younger than this are left alone (another process may still be registering them).
+"max_delete_workers": 8, # int. Parallel delete calls during a pass.
+}
+
+# --- App startup (see analytics/startup.py) ---
+startup_config = {
+"background_warm_up": True, # bool. Load the face models and the Gemini client on a background thread once the UI is built; otherwise on first use.
+"report": True, # bool. Print per-module import and warm-up times.
+}
+
+# --- Face identification over whole videos (see analytics/face_video.py) ---
+face_video_config = {
+"sample_fps": 2.0, # float. Frames per second run through face detection.
+"detect_batch_frames": 16, # int. Sampled frames detected per MTCNN call.
+"min_confidence": 0.9, # float [0-1]. Weaker detections are ignored.
+"iou_threshold": 0.3, # float [0-1]. Box overlap needed to continue a track in the next sampled frame.
+"max_gap_seconds": 2.0, # float. A track unseen this long ends; sightings of one person this close are merged into one interval.
+"crops_per_track": 3, # int. Best crops of a track that are embedded and looked up (instead of every frame).
+"min_track_detections": 2, # int. Shorter tracks are treated as false detections.
+}
+
+# --- Face gallery index (see analytics/face_index.py) ---
+face_index_config = {
+"backend": "chroma", # str. "chroma" (persistent ChromaDB collection) or "numpy" (exact in-memory matrix, memory-mapped .npy on disk).
+"space": "l2", # str. "l2" (squared euclidean, Chroma's default; MATCH_THRESHOLD is tuned for it) or "cosine".
+"dtype": "float32", # str. Storage type of the numpy matrix; "float16" halves its size at a small precision cost.
+}
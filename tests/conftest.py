@@ -0,0 +1,9 @@
+"""Shared test setup: import the app's modules from the repo root, and keep their state out of data/."""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+# read when analytics modules are imported, so they must be set before any test module imports them
+os.environ.setdefault("GEMINI_BACKEND", "standin")
+os.environ.setdefault("ANALYTICS_DATA_DIR", tempfile.mkdtemp(prefix="analytics_tests_"))
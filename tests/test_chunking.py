@@ -0,0 +1,29 @@
+"""Tests of window planning and merging for long videos (analytics/chunking.py)."""
+from analytics.chunking import merge_window_results, plan_windows
+
+
+def test_windows_cover_the_video_with_overlap():
+    windows = plan_windows(1500, window=600, overlap=30)
+    assert windows == [(0.0, 600.0), (570.0, 1170.0), (1140.0, 1500)]
+    assert plan_windows(100, window=600, overlap=30) == [(0.0, 100)]
+
+
+def test_event_seen_in_both_overlapping_windows_is_kept_once():
+    first = {"Hygiene": {"Events": [
+        {"timestamp": "00:09:45", "description": "Worker touches face without washing hands"},
+        {"timestamp": "00:02:00", "description": "Gloves changed"},
+    ]}}
+    second = {"Hygiene": {"Events": [
+        {"timestamp": "00:09:50", "description": "Worker touches face without washing hands."},
+        {"timestamp": "00:15:00", "description": "Raw meat on the vegetable board"},
+    ]}}
+    merged = merge_window_results([first, second], [600, 600], tolerance=30)
+    assert [event["timestamp"] for event in merged["Hygiene"]["Events"]] == ["00:02:00", "00:09:45", "00:15:00"]
+
+
+def test_peak_takes_the_highest_window_and_average_is_weighted():
+    first = {"PeakOccupancy": {"count": 4, "timestamps": ["00:01:00"]}, "AverageOccupancy": {"people": 2.0}}
+    second = {"PeakOccupancy": {"count": 7, "timestamps": ["00:12:00"]}, "AverageOccupancy": {"people": 5.0}}
+    merged = merge_window_results([first, second], [600, 300])
+    assert merged["PeakOccupancy"] == {"count": 7, "timestamps": ["00:12:00"]}
+    assert merged["AverageOccupancy"]["people"] == 3.0
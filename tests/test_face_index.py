@@ -0,0 +1,56 @@
+"""Tests of the NumPy face gallery index (analytics/face_index.py)."""
+import numpy as np
+import pytest
+
+from analytics.face_index import GalleryIndex, NumpyIndex
+
+
+def _embeddings(count: int, dim: int = 512, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_add_after_emptying_and_reopening(tmp_path):
+    vectors = _embeddings(2)
+    index = NumpyIndex(str(tmp_path))
+    index.add(ids=["a"], embeddings=vectors[:1].tolist(), metadatas=[{"name": "alice"}])
+    index.delete(ids=["a"])
+
+    reopened = NumpyIndex(str(tmp_path))
+    assert reopened.count() == 0
+    reopened.add(ids=["b"], embeddings=vectors[1:].tolist(), metadatas=[{"name": "bob"}])
+
+    result = NumpyIndex(str(tmp_path)).query(query_embeddings=vectors[1:].tolist(), n_results=1)
+    assert result["ids"] == [["b"]]
+    assert result["metadatas"] == [[{"name": "bob"}]]
+
+
+def test_add_rejects_other_dimension(tmp_path):
+    index = NumpyIndex(str(tmp_path))
+    index.add(ids=["a"], embeddings=_embeddings(1).tolist(), metadatas=[{}])
+    with pytest.raises(ValueError):
+        index.add(ids=["b"], embeddings=_embeddings(1, dim=128).tolist(), metadatas=[{}])
+
+
+def test_query_matches_brute_force(tmp_path):
+    gallery = _embeddings(50)
+    index = NumpyIndex(str(tmp_path))
+    index.add(ids=[f"f{i}" for i in range(50)], embeddings=gallery.tolist(), metadatas=[{} for _ in range(50)])
+
+    probes = gallery[:5] + 0.05 * _embeddings(5, seed=1)
+    result = index.query(query_embeddings=probes.tolist(), n_results=3, include=["distances"])
+    expected = ((probes[:, None, :] - gallery[None, :, :]) ** 2).sum(axis=2)
+    for row, ids in enumerate(result["ids"]):
+        assert ids == [f"f{i}" for i in np.argsort(expected[row])[:3]]
+        np.testing.assert_allclose(result["distances"][row], np.sort(expected[row])[:3], atol=1e-4)
+
+
+def test_incomplete_backend_fails_on_creation():
+    class NoQuery(GalleryIndex):
+        def add(self, ids, embeddings, metadatas): pass
+        def delete(self, ids): pass
+        def get(self, ids=None, where=None, include=("metadatas",)): return {"ids": []}
+        def count(self): return 0
+
+    with pytest.raises(TypeError):
+        NoQuery()
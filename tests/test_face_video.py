@@ -0,0 +1,62 @@
+"""Tests of face tracking across video frames (analytics/face_video.py)."""
+import numpy as np
+import pytest
+
+# face_video imports the Face tab module, which needs the app's UI and image dependencies
+pytest.importorskip("gradio")
+pytest.importorskip("PIL")
+
+from analytics.face_video import IouTracker, _intervals, iou  # noqa: E402
+
+
+def _face(x, y, size=100, confidence=0.99):
+    return {"box": [x, y, size, size], "confidence": confidence}
+
+
+def _crop(face):
+    return np.zeros((2, 2, 3), dtype=np.uint8)
+
+
+def test_iou():
+    assert iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert iou([0, 0, 10, 10], [20, 20, 10, 10]) == 0.0
+    assert iou([0, 0, 10, 10], [5, 0, 10, 10]) == pytest.approx(50 / 150)
+
+
+def test_overlapping_boxes_in_consecutive_frames_form_one_track():
+    tracker = IouTracker(iou_threshold=0.3, max_gap_seconds=2, crops_per_track=2)
+    for second in range(5):
+        # one face drifting right, one standing still far away
+        tracker.update(float(second), [_face(10 + 5 * second, 10), _face(500, 500)], _crop)
+    tracks = sorted(tracker.close(), key=lambda track: track.box[0])
+    assert [track.detections for track in tracks] == [5, 5]
+    assert (tracks[0].first_seen, tracks[0].last_seen) == (0.0, 4.0)
+
+
+def test_a_long_gap_ends_the_track():
+    tracker = IouTracker(iou_threshold=0.3, max_gap_seconds=2, crops_per_track=2)
+    tracker.update(0.0, [_face(10, 10)], _crop)
+    tracker.update(1.0, [_face(10, 10)], _crop)
+    tracker.update(5.0, [_face(10, 10)], _crop)
+    tracks = tracker.close()
+    assert sorted(track.detections for track in tracks) == [1, 2]
+
+
+def test_only_the_best_crops_are_kept_and_cut():
+    tracker = IouTracker(iou_threshold=0.3, max_gap_seconds=2, crops_per_track=2)
+    cut = []
+
+    def crop_of(face):
+        cut.append(face["confidence"])
+        return _crop(face)
+
+    for second, confidence in enumerate([0.95, 0.99, 0.91, 0.98]):
+        tracker.update(float(second), [_face(10, 10, confidence=confidence)], crop_of)
+    (track,) = tracker.close()
+    assert sorted(quality for quality, _, _ in track.best_crops) == pytest.approx([98.0, 99.0])
+    # the 0.91 sighting never made the best two, so it was never cropped
+    assert 0.91 not in cut
+
+
+def test_nearby_sightings_merge_into_one_interval():
+    assert _intervals([(10, 12), (0, 5), (6, 8)], merge_gap=1.5) == [[0, 8], [10, 12]]
@@ -0,0 +1,27 @@
+"""Tests of running several analytics on one video (analytics/fanout.py)."""
+import types
+
+from google.genai import errors
+
+from analytics import fanout
+
+
+def test_empty_selection_runs_nothing(monkeypatch):
+    monkeypatch.setattr(fanout, "prepare_video", lambda path: (_ for _ in ()).throw(AssertionError("video prepared")))
+    assert list(fanout.analyze_all("clip.mp4", [])) == []
+
+
+def test_upload_api_error_is_reported_to_every_selected_tab(monkeypatch):
+    monkeypatch.setattr(fanout, "prepare_video", lambda path: types.SimpleNamespace(path=path))
+    monkeypatch.setattr(fanout, "hash_file", lambda path: "digest")
+    monkeypatch.setattr(fanout, "cached_response", lambda *args: None)
+    monkeypatch.setattr(fanout, "is_long_video", lambda path: False)
+    monkeypatch.setattr(fanout, "video_duration", lambda path: 30.0)
+
+    def denied(*args, **kwargs):
+        raise errors.ClientError(403, {"error": {"code": 403, "message": "denied", "status": "PERMISSION_DENIED"}})
+    monkeypatch.setattr(fanout, "get_video_part", denied)
+
+    results = dict(fanout.analyze_all("clip.mp4", ["hygiene", "safety"]))
+    assert set(results) == {"hygiene", "safety"}
+    assert all(text.startswith("Gemini request failed") for text in results.values())
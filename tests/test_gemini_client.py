@@ -0,0 +1,63 @@
+"""Tests of client-side rate limiting (analytics/gemini_client.py)."""
+import threading
+import types
+
+import pytest
+
+from analytics import gemini_client
+from analytics.gemini_client import RateLimiter, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(gemini_client, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_bucket_refills_at_its_rate(clock):
+    bucket = TokenBucket(60)  # one per second
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock[0] += 0.5
+    assert bucket.wait_time(1) == pytest.approx(0.5)
+    clock[0] += 0.5
+    assert bucket.wait_time(1) == 0.0
+
+
+def test_oversized_request_only_waits_for_a_full_bucket(clock):
+    bucket = TokenBucket(100)
+    bucket.take(100)
+    assert bucket.wait_time(1000) == pytest.approx(60.0)
+
+
+def test_adjust_credits_unused_reservation(clock):
+    bucket = TokenBucket(100)
+    bucket.take(80)
+    bucket.adjust(50)
+    assert bucket.tokens == pytest.approx(70)
+
+
+def test_in_flight_cap_and_arrival_order():
+    limiter = RateLimiter(requests_per_minute=10_000, tokens_per_minute=10_000_000, max_in_flight=1)
+    order = []
+    limiter.acquire()
+
+    def waiter(name):
+        limiter.acquire()
+        order.append(name)
+        limiter.release()
+
+    threads = []
+    for name in ("first", "second", "third"):
+        thread = threading.Thread(target=waiter, args=(name,))
+        thread.start()
+        threads.append(thread)
+        # wait until this waiter is queued before starting the next
+        while len(limiter._queue) < len(threads):
+            threading.Event().wait(0.001)
+    assert order == []
+    limiter.release()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert order == ["first", "second", "third"]
@@ -0,0 +1,29 @@
+"""Tests of timestamp handling for reduced clips (analytics/preprocess.py)."""
+from analytics.preprocess import TimestampMap, format_timestamp, parse_timestamp
+
+
+def test_timestamps_round_trip():
+    assert format_timestamp(3725) == "01:02:05"
+    assert parse_timestamp("01:02:05") == 3725.0
+    assert parse_timestamp("later") is None
+
+
+def test_dropped_frames_start_a_new_segment():
+    # frames 0-2 kept, 3-9 dropped as static, 10-12 kept; the clip plays at 1 fps
+    timestamp_map = TimestampMap.from_frame_times([0, 1, 2, 10, 11, 12], fps=1.0)
+    assert timestamp_map.segments == [(0.0, 0, 3.0), (3.0, 10, 3.0)]
+    assert timestamp_map.to_original(0.5) == 0.5
+    assert timestamp_map.to_original(3.5) == 10.5
+    assert not timestamp_map.is_identity()
+
+
+def test_remap_text_rewrites_clip_times():
+    timestamp_map = TimestampMap.from_frame_times([0, 1, 2, 10, 11, 12], fps=1.0)
+    assert timestamp_map.remap_text("at 00:00:04 and 00:00:01") == "at 00:00:11 and 00:00:01"
+
+
+def test_empty_map_is_identity_and_serialises():
+    assert TimestampMap().to_original(42.0) == 42.0
+    assert TimestampMap().remap_text("00:01:00") == "00:01:00"
+    timestamp_map = TimestampMap([(0.0, 5.0, 2.0)])
+    assert TimestampMap.from_dict(timestamp_map.to_dict()) == timestamp_map
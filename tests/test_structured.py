@@ -0,0 +1,43 @@
+"""Tests of JSON repair and parsing of model output (analytics/structured.py)."""
+import json
+
+import pytest
+
+from analytics.structured import parse_json, repair_json, tidy_json_text
+
+
+def test_complete_object_is_kept_and_fences_dropped():
+    text = 'Here you go:\n```json\n{"a": [1, 2], "b": {"c": "x"}}\n```'
+    assert json.loads(repair_json(text)) == {"a": [1, 2], "b": {"c": "x"}}
+
+
+def test_truncated_object_is_cut_back_and_closed():
+    text = '{"Events": [{"timestamp": "00:00:05", "note": "spill"}, {"timestamp": "00:00:09", "no'
+    repaired = json.loads(repair_json(text))
+    assert repaired["Events"][0] == {"timestamp": "00:00:05", "note": "spill"}
+    assert all(isinstance(event, dict) for event in repaired["Events"])
+
+
+def test_trailing_comma_is_removed():
+    assert json.loads(repair_json('{"a": [1, 2,], "b": 3,}')) == {"a": [1, 2], "b": 3}
+
+
+def test_brackets_inside_strings_are_ignored():
+    text = '{"note": "a } and ] inside", "list": ["x", "y"'
+    assert json.loads(repair_json(text)) == {"note": "a } and ] inside", "list": ["x", "y"]}
+
+
+def test_unrecoverable_text_raises():
+    with pytest.raises(ValueError):
+        repair_json("no json here")
+
+
+def test_parse_json_reports_repairs():
+    assert parse_json('{"a": 1}') == ({"a": 1}, False)
+    data, repaired = parse_json('{"a": 1, "b": [2')
+    assert repaired and data["a"] == 1
+
+
+def test_tidy_json_text_leaves_prose_alone():
+    assert tidy_json_text("The model refused.") == "The model refused."
+    assert json.loads(tidy_json_text('{"a": 1')) == {"a": 1}
@@ -0,0 +1,88 @@
+"""Tests of the shared upload registry and upload garbage collection
+(analytics/gemini_files.py, analytics/upload_lifecycle.py)."""
+import types
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from analytics import gemini_client, gemini_files, upload_lifecycle
+from analytics.gemini_files import UploadRegistry
+
+
+def _record(name, used_ago=timedelta(0), expires_in=timedelta(hours=40)):
+    now = datetime.now(timezone.utc)
+    return {
+        "name": name,
+        "uploaded_at": (now - used_ago).isoformat(),
+        "last_used_at": (now - used_ago).isoformat(),
+        "expiration_time": (now + expires_in).isoformat(),
+    }
+
+
+def test_registries_sharing_a_file_merge_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "uploads.json")
+    app, batch = UploadRegistry(path), UploadRegistry(path)
+    app.put("a", _record("files/a"))
+    batch.put("b", _record("files/b"))
+    app.put("c", _record("files/c"))
+    assert sorted(UploadRegistry(path).records()) == ["a", "b", "c"]
+    batch.remove("a")
+    assert app.get("a") is None
+    assert sorted(app.records()) == ["b", "c"]
+
+
+def test_remove_if_checks_the_latest_record(tmp_path):
+    path = str(tmp_path / "uploads.json")
+    app, batch = UploadRegistry(path), UploadRegistry(path)
+    app.put("a", _record("files/a", used_ago=timedelta(hours=8)))
+    # the other process used the upload since
+    batch.put("a", _record("files/a"))
+    is_idle = lambda record: upload_lifecycle._is_idle(record, datetime.now(timezone.utc))  # noqa: E731
+    assert app.remove_if("a", is_idle) is None
+    assert app.get("a") is not None
+
+
+@pytest.fixture
+def remote(monkeypatch, tmp_path):
+    """A registry in tmp_path and a fake Files API listing `files`; returns (registry, files, deleted)."""
+    registry = UploadRegistry(str(tmp_path / "uploads.json"))
+    monkeypatch.setattr(gemini_files, "registry", registry)
+    files, deleted = [], []
+    monkeypatch.setattr(gemini_client, "list_files", lambda: list(files))
+    monkeypatch.setattr(gemini_client, "delete_file", deleted.append)
+    return registry, files, deleted
+
+
+def test_gc_deletes_idle_and_expired_uploads_only(remote, monkeypatch):
+    registry, files, deleted = remote
+    monkeypatch.setitem(upload_lifecycle.upload_lifecycle_config, "idle_seconds", 3600)
+    registry.put("fresh", _record("files/fresh"))
+    registry.put("idle", _record("files/idle", used_ago=timedelta(hours=2)))
+    registry.put("expired", _record("files/expired", expires_in=timedelta(seconds=-1)))
+
+    result = upload_lifecycle.collect_garbage()
+    assert sorted(deleted) == ["files/expired", "files/idle"]
+    assert (result["idle"], result["expired"]) == (1, 1)
+    assert sorted(registry.records()) == ["fresh"]
+
+
+def test_gc_leaves_unregistered_files_alone_by_default(remote, monkeypatch):
+    registry, files, deleted = remote
+    monkeypatch.setitem(upload_lifecycle.upload_lifecycle_config, "orphan_grace_seconds", 0)
+    old = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    files.append(types.SimpleNamespace(name="files/someone-elses", create_time=old))
+
+    assert upload_lifecycle.collect_garbage()["orphaned"] == 0
+    assert deleted == []
+
+    monkeypatch.setitem(upload_lifecycle.upload_lifecycle_config, "delete_unregistered", True)
+    assert upload_lifecycle.collect_garbage()["orphaned"] == 1
+    assert deleted == ["files/someone-elses"]
+
+
+def test_dry_run_deletes_nothing(remote, monkeypatch):
+    registry, files, deleted = remote
+    monkeypatch.setitem(upload_lifecycle.upload_lifecycle_config, "idle_seconds", 0)
+    registry.put("idle", _record("files/idle", used_ago=timedelta(minutes=5)))
+    assert upload_lifecycle.collect_garbage(dry_run=True)["candidates"] == ["files/idle"]
+    assert deleted == [] and registry.get("idle") is not None
@@ -1,11 +1,67 @@
 import base64
+import io
 import sys
 
+# Read size for streaming encodes. A multiple of 3 so every block encodes to
+# whole base64 quanta and the blocks can be concatenated without padding in
+# between; 3 MiB of input becomes 4 MiB of output.
+CHUNK_SIZE = 3 * 1024 * 1024
+
+
+def iter_base64(video_path, chunk_size=CHUNK_SIZE):
+    """Yield the base64 encoding of `video_path` as ASCII bytes, one block at a time.
+
+    Only one block of input and output is held in memory, whatever the size
+    of the video. Raises FileNotFoundError / OSError like open().
+    """
+    if chunk_size <= 0 or chunk_size % 3:
+        raise ValueError(f"chunk_size must be a positive multiple of 3, got {chunk_size}")
+    with open(video_path, "rb") as video_file:
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while True:
+            filled = video_file.readinto(buffer)
+            # a short read before EOF (pipes, network filesystems) must be topped up
+            # to a multiple of 3, or padding would land in the middle of the stream
+            while filled and filled % 3:
+                extra = video_file.readinto(view[filled:filled + 3 - filled % 3])
+                if not extra:
+                    break
+                filled += extra
+            if not filled:
+                return
+            yield base64.b64encode(view[:filled])
+
+
+def write_base64(video_path, out, chunk_size=CHUNK_SIZE):
+    """Stream the base64 encoding of `video_path` into `out` and return the number of characters written.
+
+    `out` can be a binary file, a socket, or a text stream: one with a binary
+    `.buffer` (e.g. sys.stdout) gets the bytes directly, others (e.g. io.StringIO)
+    get decoded text.
+    """
+    if hasattr(out, "sendall"):
+        write = out.sendall
+    elif hasattr(out, "buffer"):
+        out.flush()
+        write = out.buffer.write
+    elif isinstance(out, io.TextIOBase):
+        def write(block):
+            out.write(block.decode("ascii"))
+    else:
+        write = out.write
+    written = 0
+    for block in iter_base64(video_path, chunk_size):
+        write(block)
+        written += len(block)
+    if hasattr(out, "buffer"):
+        out.buffer.flush()
+    return written
+
+
 def video_to_base64(video_path):
     try:
-        with open(video_path, "rb") as video_file:
-            encoded_string = base64.b64encode(video_file.read()).decode('utf-8')
-        return encoded_string
+        return b"".join(iter_base64(video_path)).decode("ascii")
     except FileNotFoundError:
         return f"Error: Video file not found at {video_path}"
     except Exception as e:
@@ -16,5 +72,10 @@ if __name__ == "__main__":
         print("Usage: python video_byte_converter.py <path_to_video_file>")
     else:
         video_file_path = sys.argv[1]
-        base64_data = video_to_base64(video_file_path)
-        print(base64_data)
\ No newline at end of file
+        try:
+            write_base64(video_file_path, sys.stdout)
+            print()
+        except FileNotFoundError:
+            print(f"Error: Video file not found at {video_file_path}")
+        except Exception as e:
+            print(f"An error occurred: {e}")